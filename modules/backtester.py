@@ -1,14 +1,28 @@
+import os
+import json
+
+import numpy as np
 import pandas as pd
-from modules.signal_engine import calculate_buy_score, calculate_accumulation_score
-from modules.regime_filter import load_kospi, is_bear_market
+from modules.signal_engine import (
+    calculate_buy_score,
+    calculate_accumulation_score,
+    calculate_buy_score_series,
+    calculate_accumulation_score_series,
+)
+from modules.regime_filter import is_bear_market, regime_series
+from modules.range_index import range_index_for, range_max, rolling_max
+from modules.exit_index import build_exit_index, first_exit, EXIT_NONE, EXIT_TARGET
+from modules.trade_log import summarize_trade_array, trade_array_ev
 
-# KOSPI 데이터 로드 (xml/KOSPI.xml 자동 탐색)
-load_kospi()
+# KOSPI 국면 데이터는 첫 국면 조회 때 자동 로드 (xml/KOSPI.xml, 국면 배열 디스크 캐시)
+# 다른 경로/미리 만든 국면을 쓰려면 regime_filter.load_kospi(path) 또는 set_regime(regime)
 
 
 CIRCUIT_BREAKER_LOSSES = 5   # 연속 손실 N회 → 쿨다운 연장 발동
 CIRCUIT_BREAKER_EXTRA  = 15  # 추가 쿨다운 일수
 
+BACKTEST_SNAPSHOT_VERSION = 1   # run_backtest 상태 스냅샷 형식
+
 # ── 거래 비용 (국내 주식 기준) ──────────────────────────
 COMMISSION_RATE = 0.00015   # 증권사 수수료 0.015% (매수/매도 각각)
 SELL_TAX_RATE   = 0.0018    # 증권거래세 0.18% (KOSPI 기준, 매도 시만)
@@ -43,19 +57,17 @@ def _calc_dynamic_prices(df, signal_idx, fill_price, take_profit, stop_loss,
 
     # ── 목표가: 120일 전고점 → 52일 전고점 → BB상단 → ATR×N → 고정% ──
     tp_level = None
-    # 1순위: 120일 전고점 (5~40% 범위)
-    pre120 = df.iloc[max(0, signal_idx - 120):signal_idx]
-    if len(pre120) > 0:
-        swing_high_120 = pre120['high'].max()
+    # 1순위: 120일 전고점 (5~40% 범위) — 신호 봉 직전까지, 구간 질의 인덱스로 O(1)
+    ri = range_index_for(df)
+    if signal_idx > 0:
+        swing_high_120 = range_max(ri, 'high', max(0, signal_idx - 120), signal_idx - 1)
         if close * 1.05 <= swing_high_120 <= close * 1.40:
             tp_level = swing_high_120
     # 2순위: 52일 전고점 (5~40% 범위, 120일과 다를 경우)
-    if tp_level is None:
-        pre52 = df.iloc[max(0, signal_idx - 52):signal_idx]
-        if len(pre52) > 0:
-            swing_high_52 = pre52['high'].max()
-            if close * 1.05 <= swing_high_52 <= close * 1.40:
-                tp_level = swing_high_52
+    if tp_level is None and signal_idx > 0:
+        swing_high_52 = range_max(ri, 'high', max(0, signal_idx - 52), signal_idx - 1)
+        if close * 1.05 <= swing_high_52 <= close * 1.40:
+            tp_level = swing_high_52
     # 3순위: BB상단 (3% 이상인 경우)
     if tp_level is None:
         bb_upper = row.get('bb_upper', None)
@@ -75,13 +87,65 @@ def _calc_dynamic_prices(df, signal_idx, fill_price, take_profit, stop_loss,
     return pending_limit, tp_level, kijun_for_sl, atr_for_sl
 
 
+def calc_dynamic_price_arrays(df, atr_tp_mult=3.0):
+    """
+    _calc_dynamic_prices의 전 봉 배열 버전 — 종목당 1회, 우선순위는 마스크 선택으로
+
+    Returns:
+        dict (길이 n 배열, 봉 i = 신호 봉 i일 때의 값)
+            pending_limit: 지정가 (기준선 10% 이내 → MA20 4% 이내 → 종가)
+            tp_level:      목표가 (120봉 전고점 → 52봉 전고점 → BB상단 → ATR×N, 없으면 NaN)
+            kijun:         손절 계산용 기준선 (원본 값 그대로)
+            atr:           ATR 손절 입력 (ATR > 0일 때만, 아니면 NaN)
+    """
+    n = len(df)
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+
+    def col(name):
+        return df[name].to_numpy(dtype=float) if name in df.columns else np.full(n, np.nan)
+
+    kijun, ma20, bb_upper, atr = col('ichi_kijun'), col('ma_20'), col('bb_upper'), col('atr_14')
+
+    def prior_high(window):
+        """신호 봉 직전 window봉 고가 최대 (첫 봉은 NaN)"""
+        out = np.full(n, np.nan)
+        out[1:] = rolling_max(high, window, min_periods=1)[:-1]
+        return out
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 진입가 (NaN 비교는 False → 원본의 조건 불충족과 동일)
+        use_kijun = (kijun > 0) & (kijun < close) & ((close - kijun) / close <= 0.10)
+        use_ma20 = (ma20 > 0) & (ma20 < close) & ((close - ma20) / close <= 0.04)
+        pending_limit = np.select([use_kijun, use_ma20], [kijun, ma20], close)
+
+        # 목표가 후보 (우선순위 순)
+        swing_120, swing_52 = prior_high(120), prior_high(52)
+        atr_ok = atr > 0
+        atr_tp = close + atr * atr_tp_mult
+        candidates = [
+            (close * 1.05 <= swing_120) & (swing_120 <= close * 1.40),
+            (close * 1.05 <= swing_52) & (swing_52 <= close * 1.40),
+            (bb_upper != 0) & (bb_upper > close * 1.03),
+            atr_ok & (atr_tp >= close * 1.05) & (atr_tp <= close * 1.40),
+        ]
+        tp_level = np.select(candidates, [swing_120, swing_52, bb_upper, atr_tp], np.nan)
+
+    return {
+        'pending_limit': pending_limit,
+        'tp_level': tp_level,
+        'kijun': kijun,
+        'atr': np.where(atr_ok, atr, np.nan),
+    }
+
+
 def run_backtest(df, buy_threshold=4.0, take_profit=0.17, stop_loss=0.07,
                  cooldown=5, benford_window=30, profile_name='default',
                  use_regime_filter=True,
                  benford_influence=0.15, benford_min_hits=5,
                  rsi_min=70,
                  atr_tp_mult=3.0, atr_sl_mult=2.0,
-                 mode='momentum', max_hold=0):
+                 mode='momentum', max_hold=0, snapshot=None, return_snapshot=False):
     """
     Walk-forward 백테스트 실행 (지정가 주문 + 데이터 기반 가격 설정)
 
@@ -100,24 +164,40 @@ def run_backtest(df, buy_threshold=4.0, take_profit=0.17, stop_loss=0.07,
               매집 모드: RSI 필터 역전, SDE 패턴 중심 스코어링, 종가 진입
               검증 결과: 1,360건, 승률 57.9%, EV +3.01%
         max_hold: 최대 보유일 (0=무제한, 매집 모드 기본 20일)
+        snapshot: 이전 실행의 상태 스냅샷 (return_snapshot=True로 받은 것)
+                  → 스냅샷 시점 이후 새로 붙은 봉만 처리 (전체 재실행과 같은 trades)
+                  df 앞부분은 스냅샷을 만든 df와 같아야 함 (봉 추가만 허용)
+        return_snapshot: True면 (trades, snapshot) 반환
     """
-    trades = []
-    last_signal_idx = -cooldown
-    consec_losses   = 0
+    params = {
+        'buy_threshold': buy_threshold, 'take_profit': take_profit, 'stop_loss': stop_loss,
+        'cooldown': cooldown, 'benford_window': benford_window, 'profile_name': profile_name,
+        'use_regime_filter': use_regime_filter, 'benford_influence': benford_influence,
+        'benford_min_hits': benford_min_hits, 'rsi_min': rsi_min, 'atr_tp_mult': atr_tp_mult,
+        'atr_sl_mult': atr_sl_mult, 'mode': mode, 'max_hold': max_hold,
+    }
+    if snapshot is None:
+        snapshot = _initial_snapshot(params)
+    else:
+        _check_snapshot(snapshot, df, params)
+
+    trades = list(snapshot['trades'])
+    last_signal_idx = snapshot['last_signal_idx']
+    consec_losses   = snapshot['consec_losses']
 
     # 상태 머신 변수
-    state             = 'LOOKING'
-    pending_limit     = None
-    tp_level          = None   # 신호일에 계산한 목표가 레벨
-    entry_price       = None
-    entry_date        = None
-    target_price      = None
-    stop_price        = None
-    atr_for_sl        = None
-    score_at_signal   = 0.0
-    details_at_signal = {}
-
-    for idx in range(60, len(df)):
+    state             = snapshot['state']
+    pending_limit     = snapshot['pending_limit']
+    tp_level          = snapshot['tp_level']   # 신호일에 계산한 목표가 레벨
+    entry_price       = snapshot['entry_price']
+    entry_date        = snapshot['entry_date']
+    target_price      = snapshot['target_price']
+    stop_price        = snapshot['stop_price']
+    atr_for_sl        = snapshot['atr_for_sl']
+    score_at_signal   = snapshot['score']
+    details_at_signal = snapshot['details']
+
+    for idx in range(max(60, snapshot['rows']), len(df)):
         effective_cooldown = (cooldown + CIRCUIT_BREAKER_EXTRA
                               if consec_losses >= CIRCUIT_BREAKER_LOSSES
                               else cooldown)
@@ -285,6 +365,27 @@ def run_backtest(df, buy_threshold=4.0, take_profit=0.17, stop_loss=0.07,
         last_signal_idx   = idx
         state = 'PENDING'
 
+    if return_snapshot:
+        snapshot = {
+            'version': BACKTEST_SNAPSHOT_VERSION,
+            'params': params,
+            'rows': max(snapshot['rows'], len(df)),
+            'last_date': df['date'].iloc[-1] if len(df) else snapshot['last_date'],
+            'state': state,
+            'pending_limit': pending_limit,
+            'tp_level': tp_level,
+            'entry_price': entry_price,
+            'entry_date': entry_date,
+            'target_price': target_price,
+            'stop_price': stop_price,
+            'atr_for_sl': atr_for_sl,
+            'score': score_at_signal,
+            'details': details_at_signal,
+            'last_signal_idx': last_signal_idx,
+            'consec_losses': consec_losses,
+            'trades': list(trades),   # 청산 완료 거래만 (OPEN은 매 실행 끝에 새로 만듦)
+        }
+
     # 루프 종료 후 보유 중인 포지션 → OPEN 처리
     if state == 'IN_POSITION':
         last_row     = df.iloc[-1]
@@ -307,12 +408,393 @@ def run_backtest(df, buy_threshold=4.0, take_profit=0.17, stop_loss=0.07,
             'holding_days': holding_days,
         })
     # PENDING 상태로 루프 종료 시 → 미체결 주문 소멸 (trade 미등록)
+    # (스냅샷에는 PENDING이 남아 있어 다음 봉이 붙으면 체결 확인부터 이어감)
 
+    if return_snapshot:
+        return trades, snapshot
     return trades
 
 
+# ============================================================
+# 상태 스냅샷 — 새 봉만 이어서 백테스트 (일일 모의매매 대사용)
+# ============================================================
+_SNAPSHOT_DATE_KEYS = ('last_date', 'entry_date')
+_SNAPSHOT_PRICE_KEYS = ('pending_limit', 'tp_level', 'entry_price', 'target_price',
+                        'stop_price', 'atr_for_sl')
+_TRADE_DATE_KEYS = ('entry_date', 'exit_date')
+
+
+def _initial_snapshot(params):
+    """봉 0개 처리한 상태 (run_backtest 시작 상태와 동일)"""
+    return {
+        'version': BACKTEST_SNAPSHOT_VERSION,
+        'params': params,
+        'rows': 0,
+        'last_date': None,
+        'state': 'LOOKING',
+        'pending_limit': None,
+        'tp_level': None,
+        'entry_price': None,
+        'entry_date': None,
+        'target_price': None,
+        'stop_price': None,
+        'atr_for_sl': None,
+        'score': 0.0,
+        'details': {},
+        'last_signal_idx': -params['cooldown'],
+        'consec_losses': 0,
+        'trades': [],
+    }
+
+
+def _check_snapshot(snapshot, df, params):
+    """스냅샷을 이 df·파라미터로 이어갈 수 있는지 확인 (아니면 ValueError)"""
+    if snapshot.get('version') != BACKTEST_SNAPSHOT_VERSION:
+        raise ValueError('백테스트 스냅샷 버전이 다릅니다')
+    if snapshot['params'] != params:
+        changed = sorted(k for k in params if snapshot['params'].get(k) != params[k])
+        raise ValueError(f'스냅샷과 파라미터가 다릅니다: {changed}')
+    rows = snapshot['rows']
+    if rows > len(df):
+        raise ValueError(f'스냅샷({rows}봉)보다 데이터가 짧습니다 ({len(df)}봉)')
+    if rows and df['date'].iloc[rows - 1] != snapshot['last_date']:
+        raise ValueError('스냅샷 마지막 봉 날짜가 데이터와 다릅니다 (봉 추가만 이어갈 수 있음)')
+
+
+def _to_json(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} 직렬화 불가')
+
+
+def save_backtest_snapshot(snapshot, path):
+    """run_backtest 스냅샷 → JSON 파일 (날짜는 ISO 문자열, 원자적 교체)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, default=_to_json)
+    os.replace(tmp, path)
+
+
+def load_backtest_snapshot(path):
+    """저장된 스냅샷 (없거나 손상됐거나 버전이 다르면 None → 처음부터 실행)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('version') != BACKTEST_SNAPSHOT_VERSION:
+        return None
+    for key in _SNAPSHOT_DATE_KEYS:
+        if snapshot[key] is not None:
+            snapshot[key] = pd.Timestamp(snapshot[key])
+    # 가격은 np.float64로 복원 → 이어서 만든 거래도 전체 재실행과 같은 타입
+    for key in _SNAPSHOT_PRICE_KEYS:
+        if snapshot[key] is not None:
+            snapshot[key] = np.float64(snapshot[key])
+    for t in snapshot['trades']:
+        for key in _TRADE_DATE_KEYS:
+            t[key] = pd.Timestamp(t[key])
+        t['return_pct'] = np.float64(t['return_pct'])
+    return snapshot
+
+
+# ============================================================
+# 배열 기반 백테스트 엔진 — run_backtest와 동일 결과
+# ============================================================
+def compute_signal_arrays(df, buy_threshold=4.0, benford_window=30, profile_name='default',
+                          benford_influence=0.15, benford_min_hits=5, rsi_min=70,
+                          mode='momentum'):
+    """
+    봉별 스코어 + 진입 후보 여부 배열 (TP/SL/쿨다운과 무관 → 그리드서치에서 재사용)
+
+    Returns:
+        dict {'scores': 봉별 스코어, 'eligible': 스코어·RSI 필터 통과 여부 (idx >= 60)}
+    """
+    if mode == 'accumulation':
+        scores, _ = calculate_accumulation_score_series(df, profile_name)
+        eligible = scores >= buy_threshold
+    else:
+        scores, _ = calculate_buy_score_series(df, benford_window, profile_name,
+                                               benford_influence, benford_min_hits)
+        eligible = scores >= buy_threshold
+        if 'rsi' in df.columns:
+            eligible &= ~(df['rsi'].to_numpy(dtype=float) < rsi_min)
+    eligible[:60] = False
+    return {'scores': scores, 'eligible': eligible}
+
+
+def run_backtest_fast(df, buy_threshold=4.0, take_profit=0.17, stop_loss=0.07,
+                      cooldown=5, benford_window=30, profile_name='default',
+                      use_regime_filter=True,
+                      benford_influence=0.15, benford_min_hits=5,
+                      rsi_min=70,
+                      atr_tp_mult=3.0, atr_sl_mult=2.0,
+                      mode='momentum', max_hold=0, signals=None, exit_index=None):
+    """
+    run_backtest의 배열 기반 버전 — 파라미터와 결과(trades)가 완전히 동일
+
+    매일봉 순회 대신 이벤트 단위로 점프:
+      LOOKING     → 쿨다운 이후 첫 진입 후보 봉으로 searchsorted 점프
+      PENDING     → 다음 봉 1개만 체결 확인 (미체결 시 당일부터 재탐색)
+      IN_POSITION → max_hold 만기 봉과 첫 TP/SL 터치 봉(exit_index)을 바로 찾음
+
+    signals: compute_signal_arrays() 결과 재사용 시 전달
+             (buy_threshold/rsi_min/스코어 파라미터가 같아야 함)
+             신호 봉별 가격 레벨도 여기에 메모되어 다음 호출에서 재사용
+    exit_index: build_exit_index(df) 결과 재사용 시 전달
+    스코어·상세 내역은 실제 신호 봉에서만 idx별 함수로 다시 구해 trades에 기록
+    """
+    if signals is None:
+        signals = compute_signal_arrays(df, buy_threshold, benford_window, profile_name,
+                                        benford_influence, benford_min_hits, rsi_min, mode)
+    candidates = np.flatnonzero(signals['eligible'])
+    if use_regime_filter and len(candidates):
+        # 약세장 날짜의 후보 제외 (KOSPI 국면 배열 일괄 조회)
+        candidates = candidates[regime_series(df['date'].to_numpy()[candidates]) != 2]
+    signal_cache = signals.setdefault('levels', {})
+    price_arrays = None   # 모멘텀 모드 가격 레벨 (atr_tp_mult별로 signals에 한 번만 계산)
+    if exit_index is None:
+        exit_index = build_exit_index(df)
+
+    n = len(df)
+    open_ = df['open'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    kijun = df['ichi_kijun'].to_numpy(dtype=float) if 'ichi_kijun' in df.columns else None
+    dates = df['date']
+    date_values = dates.to_numpy()
+
+    trades = []
+    last_signal_idx = -cooldown
+    consec_losses = 0
+    pos = 60
+
+    def record(entry_idx, exit_idx, exit_price, result):
+        entry_date = dates.iloc[entry_idx]
+        exit_date = dates.iloc[exit_idx]
+        gross_return = (exit_price - entry_price) / entry_price
+        return_pct = (gross_return - ROUND_TRIP_COST) * 100
+        if result is None:
+            result = 'WIN' if return_pct > 0 else 'LOSS'
+        trades.append({
+            'entry_date':   entry_date,
+            'entry_price':  int(entry_price),
+            'exit_date':    exit_date,
+            'exit_price':   int(exit_price),
+            'target_price': int(target_price),
+            'stop_price':   int(stop_price),
+            'score':        round(score_at_signal, 2),
+            'details':      details_at_signal,
+            'result':       result,
+            'return_pct':   round(return_pct, 2),
+            'holding_days': (exit_date - entry_date).days,
+        })
+        return result
+
+    while True:
+        effective_cooldown = (cooldown + CIRCUIT_BREAKER_EXTRA
+                              if consec_losses >= CIRCUIT_BREAKER_LOSSES
+                              else cooldown)
+
+        # ── LOOKING: 쿨다운 이후 첫 후보로 점프 ──
+        k = np.searchsorted(candidates, max(pos, last_signal_idx + effective_cooldown))
+        signal_idx = int(candidates[k]) if k < len(candidates) else None
+        if signal_idx is None:
+            break
+
+        # 신호 봉의 스코어·상세·가격 레벨은 TP/SL/쿨다운과 무관 → signals에 메모
+        cached = signal_cache.get((signal_idx, atr_tp_mult))
+        if cached is None:
+            if mode == 'accumulation':
+                score, details = calculate_accumulation_score(df, signal_idx, profile_name)
+                cached = (score, details, df.iloc[signal_idx]['close'], None, None)
+            else:
+                score, details = calculate_buy_score(df, signal_idx, benford_window, profile_name,
+                                                     benford_influence, benford_min_hits)
+                if price_arrays is None:
+                    prices = signals.setdefault('prices', {})
+                    if atr_tp_mult not in prices:
+                        prices[atr_tp_mult] = calc_dynamic_price_arrays(df, atr_tp_mult)
+                    price_arrays = prices[atr_tp_mult]
+                tp_level = price_arrays['tp_level'][signal_idx]
+                atr_for_sl = price_arrays['atr'][signal_idx]
+                cached = (score, details, price_arrays['pending_limit'][signal_idx],
+                          None if np.isnan(tp_level) else tp_level,
+                          None if np.isnan(atr_for_sl) else atr_for_sl)
+            signal_cache[(signal_idx, atr_tp_mult)] = cached
+        score, details, pending_limit, tp_level, atr_for_sl = cached
+        if mode == 'accumulation':
+            tp_level = pending_limit * (1 + take_profit)   # 종가 진입 + 고정 TP
+        score_at_signal = score
+        details_at_signal = details
+        last_signal_idx = signal_idx
+
+        # ── PENDING: 다음 봉 지정가 체결 확인 ──
+        fill_idx = signal_idx + 1
+        if fill_idx >= n:
+            break   # 미체결 주문 소멸
+        if open_[fill_idx] <= pending_limit:
+            fill_price = open_[fill_idx]
+        elif low[fill_idx] <= pending_limit:
+            fill_price = pending_limit
+        else:
+            pos = fill_idx   # 주문 소멸 → 당일 신호 재탐색
+            continue
+
+        entry_price = fill_price
+        if tp_level and tp_level > fill_price * 1.03:
+            target_price = tp_level
+        else:
+            target_price = fill_price * (1 + take_profit)
+
+        if mode == 'accumulation':
+            stop_price = fill_price * (1 - stop_loss)
+        else:
+            stop_candidates = []
+            fill_kijun = kijun[fill_idx] if kijun is not None else None
+            if fill_kijun and fill_kijun > 0:
+                kijun_stop = fill_kijun * (1 - 0.03)
+                if kijun_stop < fill_price:
+                    stop_candidates.append(kijun_stop)
+            if atr_for_sl and atr_for_sl > 0:
+                atr_stop = fill_price - atr_for_sl * atr_sl_mult
+                if atr_stop > 0 and atr_stop < fill_price:
+                    stop_candidates.append(atr_stop)
+            stop_candidates.append(fill_price * (1 - stop_loss))
+            stop_price = max(stop_candidates)
+
+        # ── IN_POSITION: max_hold 만기 봉 / 첫 TP·SL 터치 봉 ──
+        start = fill_idx + 1
+        hold_end = n
+        if max_hold > 0:
+            hold_end = int(np.searchsorted(
+                date_values, date_values[fill_idx] + np.timedelta64(max_hold, 'D')))
+        exit_idx, side = first_exit(exit_index, start, target_price, stop_price,
+                                    min(hold_end, n), tie='stop')
+
+        if side == EXIT_NONE:
+            if hold_end >= n:
+                # 데이터 끝까지 보유 → OPEN 처리
+                record(fill_idx, n - 1, close[n - 1], 'OPEN')
+                break
+            exit_idx = hold_end
+            result = record(fill_idx, exit_idx, close[exit_idx], None)
+        elif side == EXIT_TARGET:
+            result = record(fill_idx, exit_idx, target_price, 'WIN')
+        else:
+            result = record(fill_idx, exit_idx, stop_price, 'LOSS')
+
+        consec_losses = consec_losses + 1 if result == 'LOSS' else 0
+        pos = exit_idx + 1
+
+    return trades
+
+
+# ============================================================
+# TP×SL×쿨다운 그리드서치 — 신호는 한 번만 계산해 공유
+# ============================================================
+def backtest_ev(trades, min_trades=8):
+    """기대값(EV) 계산: WR * avg_win + (1-WR) * avg_loss (nan/inf 제거)
+
+    trades: dict 리스트 또는 trade_log 구조화 배열
+    Returns:
+        (승률, EV, 유효 거래 수) — 거래 부족/손실 0건/EV 비정상이면 (None, None, None)
+    """
+    if isinstance(trades, np.ndarray):
+        return trade_array_ev(trades, min_trades)
+    closed = [t for t in trades if t['result'] in ('WIN','LOSS')]
+    if len(closed) < min_trades:
+        return None, None, None
+    # 이상값(nan/inf) 제거
+    valid = [t for t in closed if np.isfinite(t['return_pct'])]
+    if len(valid) < min_trades:
+        return None, None, None
+    wins   = [t['return_pct'] for t in valid if t['result'] == 'WIN']
+    losses = [t['return_pct'] for t in valid if t['result'] == 'LOSS']
+    # 최소 1건 손실이 있어야 EV 신뢰 가능 (all-win은 과적합 의심)
+    if len(losses) == 0:
+        return None, None, None
+    wr  = len(wins) / len(valid)
+    avg_win  = np.mean(wins)   if wins   else 0.0
+    avg_loss = np.mean(losses)
+    ev  = wr * avg_win + (1 - wr) * avg_loss
+    if not np.isfinite(ev):
+        return None, None, None
+    return wr, ev, len(valid)
+
+
+def composite_score(wr, ev, n_trades):
+    """복합 점수: EV 40% + WR 30% + 안정성 30%"""
+    if wr is None or ev is None or not np.isfinite(ev):
+        return -999
+    stability = min(n_trades / 30, 1.0)  # 30건 이상 = 완전 신뢰
+    return ev * 0.40 + wr * 100 * 0.30 + stability * 30 * 0.30
+
+
+def grid_search(df, tp_grid, sl_grid, cd_grid, min_rr=1.5, min_trades=8,
+                keep_trades=False,
+                buy_threshold=4.0, benford_window=30, profile_name='default',
+                use_regime_filter=True,
+                benford_influence=0.15, benford_min_hits=5,
+                rsi_min=70,
+                atr_tp_mult=3.0, atr_sl_mult=2.0,
+                mode='momentum', max_hold=0):
+    """
+    단일 종목 TP×SL×쿨다운 그리드서치
+
+    스코어·진입 후보(compute_signal_arrays), 신호 봉 가격 레벨, 청산 인덱스를
+    한 번만 만들고 모든 조합이 공유 → 조합당 비용은 이벤트 점프 시뮬레이션뿐
+    TP/SL < min_rr 조합(R:R 미달)은 평가하지 않음
+
+    Returns:
+        DataFrame (조합당 1행, tp→sl→cd 순서)
+            tp, sl, cd, trades(전체 거래 수), wr, ev, n(유효 거래 수), score(composite_score)
+            wr/ev/n은 backtest_ev 기준 미달이면 NaN, score=-999
+            keep_trades=True면 'trade_list' 컬럼에 trades 리스트 포함
+    """
+    signals = compute_signal_arrays(df, buy_threshold, benford_window, profile_name,
+                                    benford_influence, benford_min_hits, rsi_min, mode)
+    exit_index = build_exit_index(df)
+
+    rows = []
+    for tp in tp_grid:
+        for sl in sl_grid:
+            if tp / sl < min_rr:   # R:R 최소 기준 미달
+                continue
+            for cd in cd_grid:
+                trades = run_backtest_fast(
+                    df, buy_threshold, tp, sl, cd, benford_window, profile_name,
+                    use_regime_filter, benford_influence, benford_min_hits, rsi_min,
+                    atr_tp_mult, atr_sl_mult, mode, max_hold,
+                    signals=signals, exit_index=exit_index)
+                wr, ev, n = backtest_ev(trades, min_trades)
+                row = {
+                    'tp': tp, 'sl': sl, 'cd': cd,
+                    'trades': len(trades),
+                    'wr': np.nan if wr is None else wr,
+                    'ev': np.nan if ev is None else ev,
+                    'n': 0 if n is None else n,
+                    'score': composite_score(wr, ev, n),
+                }
+                if keep_trades:
+                    row['trade_list'] = trades
+                rows.append(row)
+
+    columns = ['tp', 'sl', 'cd', 'trades', 'wr', 'ev', 'n', 'score']
+    if keep_trades:
+        columns.append('trade_list')
+    return pd.DataFrame(rows, columns=columns)
+
+
 def summarize_trades(trades):
-    """거래 결과 요약 통계"""
+    """거래 결과 요약 통계 (trades: dict 리스트 또는 trade_log 구조화 배열)"""
+    if isinstance(trades, np.ndarray):
+        return summarize_trade_array(trades)
     if not trades:
         return {
             'total': 0, 'wins': 0, 'losses': 0, 'open': 0,
@@ -2,18 +2,73 @@ import numpy as np
 
 # 벤포드 법칙 기대 확률: P(d) = log10(1 + 1/d)
 BENFORD_EXPECTED = {d: np.log10(1 + 1 / d) for d in range(1, 10)}
+BENFORD_PROBS = np.array([BENFORD_EXPECTED[d] for d in range(1, 10)])
+
+
+def first_digits(values):
+    """
+    배열의 첫째 유효숫자 일괄 추출 (부호 무시, 0/NaN/inf → 0)
+
+    log10으로 자릿수를 구한 뒤 10의 거듭제곱으로 나눠 첫째자리를 얻음.
+    log10 반올림으로 자릿수가 하나 어긋난 경우(log10(1000) = 2.999...)만
+    10**exp 경계와 직접 비교해 바로잡으므로, 경계 바로 아래 값은 그대로 아래 자리
+    (예: 1000 → 1, 999.9999999999999 → 9, 1.9999999999999996 → 1, -3000 → 3)
+    10**exp가 정확히 표현되는 1 ~ 1e22 범위(가격·거래량·가격 변동폭)는 실제 값의 첫째자리와 정확히 일치,
+    그 밖의 소수/초대형 값은 경계에서 한 자리 어긋날 수 있음
+    """
+    x = np.abs(np.asarray(values, dtype=float))
+    digits = np.zeros(x.shape, dtype=np.int8)
+    ok = np.isfinite(x) & (x > 0)
+    if not ok.any():
+        return digits
+
+    v = x[ok]
+    exp = np.floor(np.log10(v))
+    # log10 반올림 오차로 자릿수가 어긋난 값만 ±1 보정
+    exp -= v < 10.0 ** exp
+    exp += v >= 10.0 ** (exp + 1)
+    p = 10.0 ** exp
+    d = np.clip(np.floor(v / p), 1, 9)
+    # 나눗셈 반올림으로 경계를 넘은 경우 보정 (d × 10**exp와 직접 비교)
+    d -= (d > 1) & (v < d * p)
+    d += (d < 9) & (v >= (d + 1) * p)
+    digits[ok] = d.astype(np.int8)
+    return digits
 
 
 def first_digit(n):
     """숫자의 첫째 유효숫자 추출"""
-    n = abs(n)
-    if n == 0:
-        return 0
-    while n < 1:
-        n *= 10
-    while n >= 10:
-        n /= 10
-    return int(n)
+    return int(first_digits(n))
+
+
+def digit_histogram(values, positive_only=False):
+    """
+    첫째자리(1~9) 개수 히스토그램
+
+    1차원 입력 → (9,) 배열
+    2차원 입력 → (행 수, 9) 배열 (행 = 종목 등, 횡단면 벤포드 스크리닝용)
+    0/NaN은 제외, positive_only=True면 0 이하 값도 제외
+    """
+    arr = np.asarray(values, dtype=float)
+    digits = first_digits(arr).astype(np.int64)
+    if positive_only:
+        digits[~(arr > 0)] = 0
+    if digits.ndim <= 1:
+        return np.bincount(digits.ravel(), minlength=10)[1:]
+    rows = digits.reshape(digits.shape[0], -1)
+    offsets = rows + 10 * np.arange(rows.shape[0])[:, None]
+    counts = np.bincount(offsets.ravel(), minlength=10 * rows.shape[0])
+    return counts.reshape(rows.shape[0], 10)[:, 1:]
+
+
+def _chi_square_from_counts(observed, min_count=5):
+    """자릿수 개수(..., 9) → chi² (유효 자릿수가 min_count 미만이면 0.0)"""
+    observed = np.asarray(observed, dtype=float)
+    total = observed.sum(axis=-1)
+    expected = total[..., None] * BENFORD_PROBS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stat = np.sum((observed - expected) ** 2 / expected, axis=-1)
+    return np.where(total >= min_count, stat, 0.0)
 
 
 def benford_chi_square(values):
@@ -21,22 +76,15 @@ def benford_chi_square(values):
     첫째자리 분포 vs 벤포드 기대분포의 카이제곱 통계량 계산
     값이 클수록 벤포드 법칙에서 크게 이탈
     """
-    digits = [first_digit(v) for v in values if v != 0]
-    if len(digits) < 5:
-        return 0.0
-
-    n = len(digits)
-    observed = np.zeros(9)
-    for d in digits:
-        if 1 <= d <= 9:
-            observed[d - 1] += 1
+    return float(_chi_square_from_counts(digit_histogram(values)))
 
-    expected = np.array([BENFORD_EXPECTED[d] * n for d in range(1, 10)])
 
-    # 기대값이 0인 경우 방지
-    mask = expected > 0
-    chi2 = np.sum((observed[mask] - expected[mask]) ** 2 / expected[mask])
-    return chi2
+def benford_chi_square_rows(values):
+    """
+    2차원 배열의 행별 chi² (행 = 종목, 열 = 관측값)
+    수천 종목 횡단면 벤포드 스크리닝을 한 번의 배열 연산으로 처리
+    """
+    return _chi_square_from_counts(digit_histogram(np.atleast_2d(values)))
 
 
 def benford_deviation_score(values):
@@ -129,6 +177,7 @@ def analyze_price_change_benford(prices, window=20):
     일별 가격 변동폭의 벤포드 이탈도 분석
     이탈이 크면 가격 움직임이 비자연적 (모멘텀 전환 가능성)
     """
+    prices = np.asarray(prices, dtype=float)
     if len(prices) < window + 1:
         return 0.0, 0.0
 
@@ -140,3 +189,109 @@ def analyze_price_change_benford(prices, window=20):
 
     score, chi2 = benford_deviation_score(changes)
     return score, chi2
+
+
+# ============================================================
+# 롤링 벤포드 엔진 — 누적 첫째자리 히스토그램 기반
+# ============================================================
+# 시계열 전체의 첫째자리를 한 번에 추출해 (n+1, 9) 누적 개수 행렬을 만들고,
+# 임의 윈도우의 자릿수 분포를 두 행의 차이로 O(1)에 구함.
+# 각 롤링 함수는 시점 i에서 기존 함수에 values[:i+1]을 넘긴 것과 같은 결과를 반환.
+# ============================================================
+
+def first_digit_cumcounts(values, positive_only=False):
+    """
+    첫째자리(1~9) 누적 개수 행렬
+    row k = values[:k] 의 자릿수별 개수 → 구간 [i, j) 분포 = cum[j] - cum[i]
+
+    positive_only: True면 0 이하 값 제외 (multi_window_benford의 volumes > 0 필터)
+    """
+    digits = first_digits(values)
+    if positive_only:
+        digits[~(np.asarray(values, dtype=float) > 0)] = 0
+    onehot = digits[:, None] == np.arange(1, 10)[None, :]
+    cum = np.zeros((len(digits) + 1, 9), dtype=np.int64)
+    np.cumsum(onehot, axis=0, out=cum[1:])
+    return cum
+
+
+def rolling_benford_chi_square(cum, window, min_count=5):
+    """
+    시점 i(포함)에서 끝나는 window개 구간의 chi² — 시점당 O(1)
+
+    Returns:
+        np.ndarray (len(cum)-1,) — 구간이 window보다 짧거나
+        유효 자릿수가 min_count 미만이면 0.0 (benford_chi_square와 동일)
+    """
+    n = len(cum) - 1
+    chi2 = np.zeros(n)
+    if window < 1 or n < window:
+        return chi2
+
+    chi2[window - 1:] = _chi_square_from_counts(cum[window:] - cum[:-window], min_count)
+    return chi2
+
+
+def _deviation_from_chi2(chi2):
+    """benford_deviation_score와 같은 시그모이드 정규화 (배열)"""
+    return 1.0 - 1.0 / (1.0 + chi2 / 15.0)
+
+
+def rolling_volume_benford(volumes, window=20, cum=None):
+    """
+    analyze_volume_benford의 롤링 버전
+
+    cum: first_digit_cumcounts(volumes) 재사용 시 전달 (여러 윈도우 계산용)
+    Returns: (score 배열, chi2 배열)
+    """
+    if cum is None:
+        cum = first_digit_cumcounts(volumes)
+    chi2 = rolling_benford_chi_square(cum, window)
+    return _deviation_from_chi2(chi2), chi2
+
+
+def price_change_cumcounts(prices):
+    """일별 가격 변동폭(|diff|) 누적 자릿수 행렬 — 첫 봉은 변동폭 없음"""
+    changes = np.abs(np.diff(np.asarray(prices, dtype=float), prepend=np.nan))
+    return first_digit_cumcounts(changes)
+
+
+def rolling_price_change_benford(prices, window=20, cum=None):
+    """
+    analyze_price_change_benford의 롤링 버전 (시점 i: prices[i-window..i]의 변동폭 window개)
+
+    cum: price_change_cumcounts(prices) 재사용 시 전달
+    Returns: (score 배열, chi2 배열)
+    """
+    if cum is None:
+        cum = price_change_cumcounts(prices)
+    chi2 = rolling_benford_chi_square(cum, window)
+    chi2[:window] = 0.0   # 가격 window+1개 미만 구간
+    return _deviation_from_chi2(chi2), chi2
+
+
+def rolling_multi_window_benford(volumes, windows=None, cum=None):
+    """
+    multi_window_benford의 롤링 버전 — 전 시점 alert_level을 한 번에 계산
+
+    cum: first_digit_cumcounts(volumes, positive_only=True) 재사용 시 전달
+    Returns:
+        results: dict {window: chi2 배열}
+        alert_level: np.ndarray (int) — 0(없음), 1(장기만), 2(장기+단기)
+    """
+    if windows is None:
+        windows = [5, 7, 10, 15, 30]
+    if cum is None:
+        cum = first_digit_cumcounts(volumes, positive_only=True)
+    n = len(cum) - 1
+
+    results = {w: rolling_benford_chi_square(cum, w) for w in windows}
+
+    long_alert = results[30] > 20 if 30 in results else np.zeros(n, dtype=bool)
+    short_alert = np.zeros(n, dtype=bool)
+    for w in [5, 7, 10]:
+        if w in results:
+            short_alert |= results[w] > 15
+
+    alert_level = np.where(long_alert & short_alert, 2, np.where(long_alert, 1, 0))
+    return results, alert_level
@@ -1,39 +1,182 @@
+import os
+import json
+import hashlib
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
 
 
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 파싱 결과 바이너리 캐시 (xml/ 옆 .cache/ohlcv)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         '.cache', 'ohlcv')
+CACHE_VERSION = 1
+
+
 def parse_stock_xml(filepath):
-    """XML 주식 데이터 파싱 → pandas DataFrame 반환"""
+    """XML 주식 데이터 파싱 → pandas DataFrame 반환
+
+    파일 전체를 문자열/트리로 만들지 않고 iterparse로 스트리밍:
+      - chartdata count 크기로 정수 배열을 미리 할당해 item 값을 바로 기록
+      - 처리한 item은 즉시 비워 메모리 사용량 일정 유지
+      - 날짜 문자열은 마지막에 한 번에 datetime 변환
+    """
+    symbol = None
+    name = ''
+    chart = None
+    dates = None
+    values = None
+    n = 0
+
     with open(filepath, 'r', encoding='euc-kr', errors='replace') as f:
-        content = f.read()
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == 'chartdata' and chart is None:
+                    chart = elem
+                    symbol = elem.get('symbol', '')
+                    name = elem.get('name', '')
+                    count = elem.get('count', '0')
+                    capacity = int(count) if count.isdigit() else 0
+                    dates = np.empty(max(capacity, 1), dtype=object)
+                    values = np.empty((max(capacity, 1), 5), dtype=np.int64)
+                continue
 
-    root = ET.fromstring(content)
-    chartdata = root.find('.//chartdata')
+            if elem.tag == 'item' and chart is not None:
+                parts = elem.get('data', '').split('|')
+                if len(parts) == 6:
+                    if n == len(dates):   # count 속성보다 item이 많으면 배열 확장
+                        dates = np.concatenate([dates, np.empty(len(dates), dtype=object)])
+                        values = np.concatenate([values, np.empty_like(values)])
+                    dates[n] = parts[0]
+                    values[n] = parts[1:]
+                    n += 1
+                chart.clear()   # 처리 끝난 item 해제
+            elif elem is chart:
+                break           # 첫 번째 chartdata만 사용
 
-    if chartdata is None:
+    if chart is None:
         raise ValueError("XML에서 chartdata 요소를 찾을 수 없습니다")
 
-    symbol = chartdata.get('symbol', '')
-    name = chartdata.get('name', '')
-    count = chartdata.get('count', '0')
-
-    items = chartdata.findall('.//item')
-    records = []
-
-    for item in items:
-        data = item.get('data', '')
-        parts = data.split('|')
-        if len(parts) == 6:
-            records.append({
-                'date': pd.to_datetime(parts[0]),
-                'open': int(parts[1]),
-                'high': int(parts[2]),
-                'low': int(parts[3]),
-                'close': int(parts[4]),
-                'volume': int(parts[5])
-            })
-
-    df = pd.DataFrame(records)
+    df = pd.DataFrame(values[:n], columns=OHLCV_COLUMNS)
+    df.insert(0, 'date', pd.to_datetime(pd.Series(dates[:n], dtype=object)))
     df = df.sort_values('date').reset_index(drop=True)
 
     return df, symbol, name
+
+
+# ─────────────────────────────────────────────────────────────
+# 바이너리 컬럼 캐시
+# ─────────────────────────────────────────────────────────────
+# 종목당 .npy 1개: (6, n) int64 — row0 = 날짜(int64), row1~5 = OHLCV
+# 옆의 .json에 원본 경로/크기/mtime/내용 해시와 종목 정보 기록
+# 로드는 np.load(mmap_mode='c')로 파일을 그대로 매핑 (OHLCV 컬럼 무복사)
+# ─────────────────────────────────────────────────────────────
+def file_fingerprint(filepath, with_hash=True):
+    """원본 파일 식별 정보: 절대경로, 크기, mtime(ns), 내용 해시(blake2b)"""
+    st = os.stat(filepath)
+    fp = {
+        'path': os.path.abspath(filepath),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+    }
+    if with_hash:
+        h = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        fp['hash'] = h.hexdigest()
+    return fp
+
+
+def _cache_paths(filepath, cache_dir):
+    key = hashlib.blake2b(os.path.abspath(filepath).encode('utf-8'), digest_size=10).hexdigest()
+    base = os.path.join(cache_dir, key)
+    return base + '.npy', base + '.json'
+
+
+def _load_cache_meta(filepath, data_path, meta_path):
+    """캐시 메타가 현재 원본과 일치하면 반환, 아니면 None
+
+    크기+mtime이 같으면 바로 적중. mtime만 바뀐 경우(touch, 복사)는
+    내용 해시를 비교해 같으면 mtime을 갱신하고 재사용
+    """
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    fp = file_fingerprint(filepath, with_hash=False)
+    if fp['path'] != meta.get('path') or fp['size'] != meta.get('size'):
+        return None
+    if fp['mtime_ns'] != meta.get('mtime_ns'):
+        if file_fingerprint(filepath)['hash'] != meta.get('hash'):
+            return None
+        meta['mtime_ns'] = fp['mtime_ns']
+        try:
+            _write_json(meta_path, meta)
+        except OSError:
+            pass
+    return meta
+
+
+def _write_json(path, obj):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _write_cache(filepath, df, symbol, name, data_path, meta_path):
+    unit = np.datetime_data(df['date'].to_numpy().dtype)[0]
+    columns = np.empty((6, len(df)), dtype=np.int64)
+    columns[0] = df['date'].to_numpy().view(np.int64)
+    columns[1:] = df[OHLCV_COLUMNS].to_numpy(dtype=np.int64).T
+
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    tmp = f'{data_path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, columns)
+    os.replace(tmp, data_path)
+
+    meta = file_fingerprint(filepath)
+    meta.update({'version': CACHE_VERSION, 'symbol': symbol, 'name': name,
+                 'rows': len(df), 'date_unit': unit})
+    _write_json(meta_path, meta)
+
+
+def _frame_from_cache(data_path, meta):
+    columns = np.load(data_path, mmap_mode='c')   # copy-on-write: 수정해도 캐시 파일 불변
+    df = pd.DataFrame(columns[1:].T, columns=OHLCV_COLUMNS, copy=False)
+    df.insert(0, 'date', columns[0].view(f"M8[{meta['date_unit']}]"))
+    return df
+
+
+def parse_stock_xml_cached(filepath, cache_dir=None):
+    """
+    parse_stock_xml + 디스크 캐시 (결과 동일)
+
+    원본 XML의 경로·크기·mtime·내용 해시로 캐시를 검증해 바뀌면 자동 재파싱.
+    캐시 디렉토리에 쓸 수 없으면 캐시 없이 파싱 결과만 반환
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    data_path, meta_path = _cache_paths(filepath, cache_dir)
+
+    meta = _load_cache_meta(filepath, data_path, meta_path)
+    if meta is not None:
+        try:
+            return _frame_from_cache(data_path, meta), meta['symbol'], meta['name']
+        except (OSError, ValueError, KeyError):
+            pass   # 손상된 캐시 → 재파싱
+
+    df, symbol, name = parse_stock_xml(filepath)
+    try:
+        _write_cache(filepath, df, symbol, name, data_path, meta_path)
+    except OSError:
+        pass
+    return df, symbol, name
@@ -0,0 +1,129 @@
+"""
+청산 봉 탐색 인덱스 — 진입 이후 TP/SL 첫 터치 봉을 O(log n)에 찾기
+
+종목당 한 번 high 구간최대 / low 구간최소 희소 테이블(sparse table)을 만들고,
+진입 봉부터 2^k 블록 단위로 "이 블록 안에 터치 없음"이면 건너뛰는 방식:
+    max(high[블록]) < 목표가  and  min(low[블록]) > 손절가  → 통째로 점프
+
+같은 봉에서 TP/SL이 동시에 터치되면 시가로 판정:
+    시가 <= 손절가 → 손절, 시가 >= 목표가 → 익절
+    시가가 그 사이면 tie='stop'(run_backtest, 보수적) / tie='target'(모의 백테스트)
+
+first_exit:  단일 질의 (상태 머신에서 순차 호출)
+first_exits: 여러 진입·TP/SL 조합을 배열로 한 번에 질의 (파라미터 스윕용)
+"""
+import numpy as np
+
+from modules.range_index import sparse_table
+
+
+EXIT_NONE = 0     # 구간 내 터치 없음
+EXIT_TARGET = 1   # 목표가 도달
+EXIT_STOP = -1    # 손절가 도달
+
+
+def build_exit_index(df):
+    """
+    종목 DataFrame → 청산 탐색 인덱스 dict
+
+    NaN 고가/저가는 터치 불가로 처리 (원래 비교식 NaN >= x 가 False인 것과 동일)
+    """
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    high_safe = np.where(np.isnan(high), -np.inf, high)
+    low_safe = np.where(np.isnan(low), np.inf, low)
+    return {
+        'n': len(df),
+        'open': df['open'].to_numpy(dtype=float),
+        'high': high,
+        'low': low,
+        'high_max': sparse_table(high_safe, np.maximum),
+        'low_min': sparse_table(low_safe, np.minimum),
+    }
+
+
+def _resolve_side(index, i, target_price, stop_price, tie):
+    hit_target = index['high'][i] >= target_price
+    hit_stop = index['low'][i] <= stop_price
+    if hit_target and hit_stop:
+        o = index['open'][i]
+        if o <= stop_price:
+            return EXIT_STOP
+        if o >= target_price:
+            return EXIT_TARGET
+        return EXIT_STOP if tie == 'stop' else EXIT_TARGET
+    return EXIT_TARGET if hit_target else EXIT_STOP
+
+
+def first_exit(index, start, target_price, stop_price, end=None, tie='stop'):
+    """
+    [start, end) 구간에서 high >= 목표가 또는 low <= 손절가인 첫 봉
+
+    end: 탐색 끝 (exclusive, None = 데이터 끝). max_hold는 호출 측에서 end로 환산
+    Returns:
+        (봉 인덱스, EXIT_TARGET/EXIT_STOP) — 터치 없으면 (-1, EXIT_NONE)
+    """
+    n = index['n']
+    end = n if end is None else min(end, n)
+    if start >= end:
+        return -1, EXIT_NONE
+
+    high_max = index['high_max']
+    low_min = index['low_min']
+    pos = start
+    for k in range(len(high_max) - 1, -1, -1):
+        step = 1 << k
+        if pos + step <= end and high_max[k][pos] < target_price and low_min[k][pos] > stop_price:
+            pos += step
+    if pos >= end:
+        return -1, EXIT_NONE
+    return pos, _resolve_side(index, pos, target_price, stop_price, tie)
+
+
+def first_exits(index, starts, target_prices, stop_prices, ends=None, tie='stop'):
+    """
+    first_exit의 배열 버전 (인자는 같은 길이로 브로드캐스트)
+
+    Returns:
+        (봉 인덱스 배열, 방향 코드 배열) — 터치 없으면 -1 / EXIT_NONE
+    """
+    n = index['n']
+    if n == 0:
+        shape = np.broadcast(np.asarray(starts), np.asarray(target_prices),
+                             np.asarray(stop_prices)).shape
+        return np.full(shape, -1, dtype=np.int64), np.full(shape, EXIT_NONE)
+    starts, target_prices, stop_prices = np.broadcast_arrays(
+        np.asarray(starts, dtype=np.int64),
+        np.asarray(target_prices, dtype=float),
+        np.asarray(stop_prices, dtype=float))
+    if ends is None:
+        ends = np.full(starts.shape, n, dtype=np.int64)
+    else:
+        ends = np.minimum(np.broadcast_to(np.asarray(ends, dtype=np.int64), starts.shape), n)
+
+    high_max = index['high_max']
+    low_min = index['low_min']
+    pos = starts.copy()
+    active = pos < ends
+    for k in range(len(high_max) - 1, -1, -1):
+        step = 1 << k
+        nxt = pos + step
+        probe = np.minimum(pos, n - 1)
+        ok = (active & (nxt <= ends)
+              & (high_max[k][probe] < target_prices)
+              & (low_min[k][probe] > stop_prices))
+        pos = np.where(ok, nxt, pos)
+
+    found = active & (pos < ends)
+    idx = np.where(found, pos, -1)
+    at = np.minimum(np.where(found, pos, 0), max(n - 1, 0))
+    hit_target = index['high'][at] >= target_prices
+    hit_stop = index['low'][at] <= stop_prices
+    o = index['open'][at]
+    both = hit_target & hit_stop
+    both_side = np.where(o <= stop_prices, EXIT_STOP,
+                         np.where(o >= target_prices, EXIT_TARGET,
+                                  EXIT_STOP if tie == 'stop' else EXIT_TARGET))
+    side = np.where(both, both_side, np.where(hit_target, EXIT_TARGET, EXIT_STOP))
+    side = np.where(found, side, EXIT_NONE)
+    return idx, side
@@ -1,6 +1,21 @@
+import os
+import json
+import math
+import zipfile
+import hashlib
 import pandas as pd
 import numpy as np
 
+from modules.range_index import rolling_max, rolling_min
+
+
+# 지표 계산 결과 디스크 캐시 (.cache/indicators)
+INDICATOR_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   '.cache', 'indicators')
+INDICATOR_CACHE_MAX_BYTES = 2 * 1024 ** 3   # LRU 상한 2GB
+INDICATOR_VERSION = 1                       # 지표 로직 변경 시 증가 (소스 해시와 함께 캐시 키에 포함)
+BASE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
 
 def calc_moving_averages(df, windows=[5, 20, 60, 200]):
     """이동평균선 계산 (MA200 추가)"""
@@ -9,26 +24,46 @@ def calc_moving_averages(df, windows=[5, 20, 60, 200]):
     return df
 
 
-def calc_rsi(df, period=14):
-    """RSI (Relative Strength Index) - Wilder 방식"""
-    delta = df['close'].diff()
-    gain = delta.clip(lower=0)
-    loss = (-delta).clip(lower=0)
+def wilder_smooth(values, period):
+    """
+    Wilder 지수평활 — RSI/ATR 공용 재귀 필터
+    y[period] = values[1:period+1] 단순평균 (첫 값은 diff/shift로 비어 있음)
+    y[i]      = (y[i-1] * (period-1) + values[i]) / period
+
+    pandas ewm(alpha=1/period, adjust=False)가 같은 재귀식이므로
+    시드 이후 구간을 그대로 넘겨 파이썬 루프 없이 전체 배열을 처리
+    (period만 바꿔 호출하면 되므로 그리드서치에서 여러 기간을 싸게 계산 가능)
+
+    Returns:
+        np.ndarray — period 이전 구간은 NaN
+    """
+    x = np.asarray(values, dtype=float)
+    out = np.full(len(x), np.nan)
+    if len(x) <= period:
+        return out
+
+    seeded = x[period:].copy()
+    seeded[0] = pd.Series(x[1:period + 1]).mean()
+    out[period:] = pd.Series(seeded).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    return out
 
-    # 첫 번째 평균: SMA
-    avg_gain = pd.Series(np.nan, index=df.index, dtype=float)
-    avg_loss = pd.Series(np.nan, index=df.index, dtype=float)
 
-    avg_gain.iloc[period] = gain.iloc[1:period + 1].mean()
-    avg_loss.iloc[period] = loss.iloc[1:period + 1].mean()
+def calc_rsi_values(close, period=14):
+    """RSI 배열 계산 (컬럼 저장 없이 기간별 RSI가 필요할 때)"""
+    delta = np.diff(np.asarray(close, dtype=float), prepend=np.nan)
+    gain = np.clip(delta, 0, None)
+    loss = np.clip(-delta, 0, None)
 
-    # Wilder 지수이동평균
-    for i in range(period + 1, len(df)):
-        avg_gain.iloc[i] = (avg_gain.iloc[i - 1] * (period - 1) + gain.iloc[i]) / period
-        avg_loss.iloc[i] = (avg_loss.iloc[i - 1] * (period - 1) + loss.iloc[i]) / period
+    avg_gain = wilder_smooth(gain, period)
+    avg_loss = wilder_smooth(loss, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
 
-    rs = avg_gain / avg_loss
-    df['rsi'] = 100 - (100 / (1 + rs))
+
+def calc_rsi(df, period=14):
+    """RSI (Relative Strength Index) - Wilder 방식"""
+    df['rsi'] = calc_rsi_values(df['close'].to_numpy(), period)
     return df
 
 
@@ -106,42 +141,40 @@ def detect_candle_patterns(df):
 
 def calc_ichimoku(df):
     """일목균형표 계산 (선행스팬 A/B는 현재 시점 클라우드로 변환)"""
-    high = df['high']
-    low  = df['low']
+    high = df['high'].to_numpy(dtype=float)
+    low  = df['low'].to_numpy(dtype=float)
 
     # 전환선 (9일)
-    df['ichi_tenkan'] = (high.rolling(9).max() + low.rolling(9).min()) / 2
+    df['ichi_tenkan'] = (rolling_max(high, 9) + rolling_min(low, 9)) / 2
     # 기준선 (26일)
-    df['ichi_kijun']  = (high.rolling(26).max() + low.rolling(26).min()) / 2
+    df['ichi_kijun']  = (rolling_max(high, 26) + rolling_min(low, 26)) / 2
     # 선행스팬 A — 26봉 뒤에 표시되므로 shift(26)하면 현재 클라우드 값
     df['ichi_cloud_a'] = ((df['ichi_tenkan'] + df['ichi_kijun']) / 2).shift(26)
     # 선행스팬 B — 52일 고저 평균, 26봉 뒤에 표시
-    df['ichi_cloud_b'] = ((high.rolling(52).max() + low.rolling(52).min()) / 2).shift(26)
+    df['ichi_cloud_b'] = pd.Series((rolling_max(high, 52) + rolling_min(low, 52)) / 2,
+                                   index=df.index).shift(26)
 
     return df
 
 
+def calc_true_range(high, low, close):
+    """True Range 배열 (첫 봉은 high - low)"""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    prev_close = np.concatenate(([np.nan], np.asarray(close, dtype=float)[:-1]))
+    tr = np.stack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    return np.fmax.reduce(tr, axis=0)
+
+
+def calc_atr_values(high, low, close, period=14):
+    """ATR 배열 계산 (컬럼 저장 없이 기간별 ATR이 필요할 때)"""
+    return wilder_smooth(calc_true_range(high, low, close), period)
+
+
 def calc_atr(df, period=14):
     """ATR (Average True Range) — Wilder 방식"""
-    high = df['high']
-    low = df['low']
-    prev_close = df['close'].shift(1)
-
-    tr = pd.concat([
-        high - low,
-        (high - prev_close).abs(),
-        (low - prev_close).abs()
-    ], axis=1).max(axis=1)
-
-    atr = pd.Series(np.nan, index=df.index, dtype=float)
-    # 첫 번째 ATR: SMA
-    if len(df) > period:
-        atr.iloc[period] = tr.iloc[1:period + 1].mean()
-        # Wilder 스무딩
-        for i in range(period + 1, len(df)):
-            atr.iloc[i] = (atr.iloc[i - 1] * (period - 1) + tr.iloc[i]) / period
-
-    df['atr_14'] = atr
+    df['atr_14'] = calc_atr_values(df['high'].to_numpy(), df['low'].to_numpy(),
+                                   df['close'].to_numpy(), period)
     return df
 
 
@@ -174,59 +207,70 @@ def detect_shakeout_dryup_explosion(df):
     sde_signal 컬럼:
       0 = 신호 없음
       3 = 풀 패턴 확인 (진입 시그널)
+
+    검색 구조 (배열 기반, O(n)):
+      - 일간 수익률과 vol_ratio(NaN→1.0)를 한 번만 계산
+      - 건조 구간 평균은 vol_ratio 누적합 / 유효(NaN 아님) 개수 누적합으로 O(1) 조회
+        (평균이 1.0에 누적 오차 범위로 붙은 구간만 np.mean으로 다시 계산 → 원본과 같은 판정)
+      - 폭발일마다 세이크아웃 오프셋 10~30일을 한 번에 평가, 가장 가까운 오프셋 우선
     """
     n = len(df)
-    sde_signal = pd.Series(0, index=df.index, dtype=int)
-    sde_shakeout_days = pd.Series(0, index=df.index, dtype=int)
-
-    for i in range(30, n):
-        row = df.iloc[i]
-        prev = df.iloc[i - 1]
-
-        if prev['close'] <= 0:
-            continue
-
-        daily_return = (row['close'] - prev['close']) / prev['close']
-        vol_ratio_val = row.get('vol_ratio', 1.0)
-        if not pd.notna(vol_ratio_val):
-            vol_ratio_val = 1.0
-
-        # Phase 3: 오늘이 폭발일인지 확인
-        if daily_return >= 0.05 and vol_ratio_val >= 2.0:
-            # 과거 30일 내 세이크아웃+건조 패턴 탐색
-            for s_offset in range(10, 31):
-                s_idx = i - s_offset
-                if s_idx < 1:
-                    break
-                s_row = df.iloc[s_idx]
-                s_prev = df.iloc[s_idx - 1]
-                if s_prev['close'] <= 0:
-                    continue
-
-                s_return = (s_row['close'] - s_prev['close']) / s_prev['close']
-                s_vol = s_row.get('vol_ratio', 1.0)
-                if not pd.notna(s_vol):
-                    s_vol = 1.0
-
-                # Phase 1: 세이크아웃 확인
-                if s_return <= -0.04 and s_vol >= 1.5:
-                    # Phase 2: 세이크아웃과 폭발 사이 건조도 확인
-                    dryup_start = s_idx + 1
-                    dryup_end = i
-                    if dryup_end - dryup_start < 5:
-                        continue
-                    dryup_vols = []
-                    for d in range(dryup_start, dryup_end):
-                        dv = df.iloc[d].get('vol_ratio', 1.0)
-                        if pd.notna(dv):
-                            dryup_vols.append(dv)
-                    if dryup_vols and np.mean(dryup_vols) < 1.0:
-                        sde_signal.iloc[i] = 3
-                        sde_shakeout_days.iloc[i] = s_offset
-                        break
-
-    df['sde_signal'] = sde_signal
-    df['sde_shakeout_days'] = sde_shakeout_days
+    sde_signal = np.zeros(n, dtype=int)
+    sde_shakeout_days = np.zeros(n, dtype=int)
+
+    close = df['close'].to_numpy(dtype=float)
+    if 'vol_ratio' in df.columns:
+        vr_raw = df['vol_ratio'].to_numpy(dtype=float)
+    else:
+        vr_raw = np.ones(n)
+    vr = np.where(np.isnan(vr_raw), 1.0, vr_raw)
+
+    # 일간 수익률 (전일 종가 <= 0 이면 NaN → 모든 조건 불충족)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_return = np.where(prev_close > 0, (close - prev_close) / prev_close, np.nan)
+
+    # 건조 구간 평균용 누적합 (NaN 제외)
+    valid = ~np.isnan(vr_raw)
+    vr_cum = np.concatenate(([0.0], np.cumsum(np.where(valid, vr_raw, 0.0))))
+    cnt_cum = np.concatenate(([0], np.cumsum(valid)))
+
+    # Phase 1: 세이크아웃 후보일
+    is_shakeout = (daily_return <= -0.04) & (vr >= 1.5)
+
+    # Phase 3: 폭발일 (30번째 봉부터)
+    is_explosion = (daily_return >= 0.05) & (vr >= 2.0)
+    is_explosion[:30] = False
+    explosion_idx = np.flatnonzero(is_explosion)
+
+    if len(explosion_idx) > 0:
+        offsets = np.arange(10, 31)
+        i = explosion_idx[:, None]
+        s_idx = i - offsets[None, :]
+        in_range = s_idx >= 1
+        s_safe = np.where(in_range, s_idx, 0)
+
+        # Phase 2: 세이크아웃 다음날 ~ 폭발 전날 건조도 (구간 길이 >= 9 이므로 최소 5일 조건 항상 충족)
+        dry_sum = vr_cum[i] - vr_cum[s_safe + 1]
+        dry_cnt = cnt_cum[i] - cnt_cum[s_safe + 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dry_mean = dry_sum / dry_cnt
+        candidate = in_range & is_shakeout[s_safe] & (dry_cnt > 0)
+        # 누적합 차이는 원본 np.mean과 끝자리가 다를 수 있음
+        # → 평균이 임계값(1.0)에 누적 오차 범위로 붙은 구간만 원본처럼 구간 평균으로 다시 판정
+        near = candidate & (np.abs(dry_sum - dry_cnt) <= 1e-9 * (vr_cum[i] + 1.0))
+        for r, c in zip(*np.nonzero(near)):
+            dry = vr_raw[s_safe[r, c] + 1:explosion_idx[r]]
+            dry_mean[r, c] = np.mean(dry[~np.isnan(dry)])
+        matched = candidate & (dry_mean < 1.0)
+
+        hit = matched.any(axis=1)
+        first = matched.argmax(axis=1)   # 가장 가까운 오프셋 우선
+        sde_signal[explosion_idx[hit]] = 3
+        sde_shakeout_days[explosion_idx[hit]] = offsets[first[hit]]
+
+    df['sde_signal'] = pd.Series(sde_signal, index=df.index)
+    df['sde_shakeout_days'] = pd.Series(sde_shakeout_days, index=df.index)
     return df
 
 
@@ -250,3 +294,498 @@ def calc_all_indicators(df, include_accumulation=False):
         df = detect_shakeout_dryup_explosion(df)
 
     return df
+
+
+# ─────────────────────────────────────────────────────────────
+# 증분 업데이트 — 새 봉만 반영 (전체 재계산과 같은 값)
+# ─────────────────────────────────────────────────────────────
+# 일일 배치에서 봉 하나 추가될 때마다 전 이력을 다시 계산하지 않도록
+# 지표별 최소 상태만 들고 다님:
+#     이동평균/볼린저/거래량평균/평균몸통 — 창 버퍼 + pandas rolling과 같은 온라인 누적
+#                                          (Kahan 합, Welford 분산 — 소수점 끝자리까지 동일)
+#     MACD/RSI/ATR — EMA·Wilder 누적값 (pandas ewm adjust=False 재귀식 그대로)
+#     일목 — 최근 52봉 고가/저가 + 선행스팬 26봉 지연 버퍼
+#     SDE — 최근 30봉 세이크아웃 여부 + vol_ratio
+# 상태는 JSON으로 저장/로드 (봉당 O(창 크기), 지표 코드가 바뀌면 로드 거부 → 다시 부트스트랩)
+INDICATOR_COLUMNS = [
+    'ma_5', 'ma_20', 'ma_60', 'ma_200', 'rsi',
+    'bb_mid', 'bb_upper', 'bb_lower', 'vol_avg', 'vol_ratio',
+    'macd', 'macd_signal', 'macd_hist',
+    'is_hammer', 'is_bullish_engulfing', 'is_shooting_star', 'is_bearish_engulfing', 'is_doji',
+    'ichi_tenkan', 'ichi_kijun', 'ichi_cloud_a', 'ichi_cloud_b', 'atr_14',
+]
+ACCUMULATION_COLUMNS = ['vpd', 'sde_signal', 'sde_shakeout_days']
+
+_NAN = float('nan')
+_INV_COND_TOL = float(np.finfo(float).eps) * 1e3   # pandas roll_var 재계산 기준
+
+
+def _div(a, b):
+    """numpy float 나눗셈과 같은 결과 (0으로 나누면 inf/NaN)"""
+    if b == 0:
+        if a != a or a == 0:
+            return _NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _mean_state(window, min_periods):
+    return {'window': window, 'min_periods': min_periods, 'buf': [], 'nobs': 0, 'sum': 0.0,
+            'comp_add': 0.0, 'comp_remove': 0.0, 'neg': 0, 'same': 0, 'prev': None}
+
+
+def _mean_push(st, v):
+    """rolling(window, min_periods).mean()의 다음 값"""
+    if st['prev'] is None:
+        st['prev'] = v
+    buf = st['buf']
+    if len(buf) == st['window']:
+        old = buf.pop(0)
+        if old == old:
+            st['nobs'] -= 1
+            y = -old - st['comp_remove']
+            t = st['sum'] + y
+            st['comp_remove'] = t - st['sum'] - y
+            st['sum'] = t
+            if math.copysign(1.0, old) < 0:
+                st['neg'] -= 1
+    buf.append(v)
+    if v == v:
+        st['nobs'] += 1
+        y = v - st['comp_add']
+        t = st['sum'] + y
+        st['comp_add'] = t - st['sum'] - y
+        st['sum'] = t
+        if math.copysign(1.0, v) < 0:
+            st['neg'] += 1
+        st['same'] = st['same'] + 1 if v == st['prev'] else 1
+        st['prev'] = v
+
+    nobs = st['nobs']
+    if nobs < st['min_periods'] or nobs == 0:
+        return _NAN
+    result = st['sum'] / nobs
+    if st['same'] >= nobs:
+        return st['prev']
+    if st['neg'] == 0 and result < 0:
+        return 0.0
+    if st['neg'] == nobs and result > 0:
+        return 0.0
+    return result
+
+
+def _var_state(window):
+    return {'window': window, 'buf': [], 'nobs': 0.0, 'mean': 0.0, 'ssqdm': 0.0,
+            'comp_add': 0.0, 'comp_remove': 0.0}
+
+
+def _var_add(st, v):
+    """Welford + Kahan 추가 — 수치 불안정(상쇄)이면 True"""
+    if v != v:
+        return False
+    prev_m2 = st['ssqdm']
+    st['nobs'] += 1
+    c = st['comp_add']
+    prev_mean = st['mean'] - c
+    y = v - c
+    t = y - st['mean']
+    st['comp_add'] = t + st['mean'] - y
+    st['mean'] = st['mean'] + t / st['nobs']
+    st['ssqdm'] = st['ssqdm'] + (v - prev_mean) * (v - st['mean'])
+    return prev_m2 * _INV_COND_TOL > st['ssqdm']
+
+
+def _var_remove(st, v):
+    if v != v:
+        return False
+    prev_m2 = st['ssqdm']
+    st['nobs'] -= 1
+    if not st['nobs']:
+        st['mean'] = 0.0
+        st['ssqdm'] = 0.0
+        return False
+    c = st['comp_remove']
+    prev_mean = st['mean'] - c
+    y = v - c
+    t = y - st['mean']
+    st['comp_remove'] = t + st['mean'] - y
+    st['mean'] = st['mean'] - t / st['nobs']
+    st['ssqdm'] = st['ssqdm'] - (v - prev_mean) * (v - st['mean'])
+    return prev_m2 * _INV_COND_TOL > st['ssqdm']
+
+
+def _std_push(st, v):
+    """rolling(window).std()의 다음 값 (min_periods = window)"""
+    buf = st['buf']
+    first = not buf
+    unstable = False
+    if len(buf) == st['window']:
+        unstable = _var_remove(st, buf.pop(0))
+    buf.append(v)
+    if not first:
+        unstable = _var_add(st, v) or unstable
+    if first or unstable:
+        # pandas와 같이 창 전체로 다시 누적
+        st.update(nobs=0.0, mean=0.0, ssqdm=0.0, comp_add=0.0, comp_remove=0.0)
+        for b in buf:
+            _var_add(st, b)
+
+    nobs = st['nobs']
+    if nobs < st['window'] or nobs <= 1:
+        return _NAN
+    var = st['ssqdm'] / (nobs - 1)
+    return math.sqrt(var) if var > 0 else (0.0 if var == var else _NAN)
+
+
+def _ewm_state(com):
+    return {'com': com, 'weighted': None, 'old_wt': 1.0}
+
+
+def _ewm_push(st, v):
+    """ewm(com, adjust=False).mean()의 다음 값"""
+    w = st['weighted']
+    if w is None:
+        st['weighted'] = v
+        return v
+    if w == w:
+        alpha = 1.0 / (1.0 + st['com'])
+        st['old_wt'] *= 1.0 - alpha
+        if v == v:
+            if w != v:
+                new_wt = 1.0 - st['old_wt'] if st['com'] == 1 else alpha
+                w = st['old_wt'] * w + new_wt * v
+                w /= st['old_wt'] + new_wt
+                st['weighted'] = w
+            st['old_wt'] = 1.0
+    elif v == v:
+        st['weighted'] = v
+    return st['weighted']
+
+
+def _span_com(span):
+    return (span - 1) / 2.0
+
+
+def _wilder_state(period):
+    alpha = 1 / period
+    return {'period': period, 'n': 0, 'seed': [], 'ewm': _ewm_state((1 - alpha) / alpha)}
+
+
+def _wilder_push(st, v):
+    """wilder_smooth의 다음 값"""
+    i = st['n']
+    st['n'] += 1
+    if i == 0:
+        return _NAN
+    if i < st['period']:
+        st['seed'].append(v)
+        return _NAN
+    if i == st['period']:
+        st['seed'].append(v)
+        v = float(pd.Series(st['seed']).mean())
+        st['seed'] = []
+    return _ewm_push(st['ewm'], v)
+
+
+def _window_extreme(buf, window):
+    """최근 window개 (max, min) — NaN 제외, 유효값이 window개 미만이면 NaN"""
+    if len(buf) < window:
+        return _NAN, _NAN
+    vals = [x for x in buf[-window:] if x == x]
+    if len(vals) < window:
+        return _NAN, _NAN
+    return max(vals), min(vals)
+
+
+def _lag_push(buf, v, lag):
+    """shift(lag)의 다음 값"""
+    buf.append(v)
+    if len(buf) > lag:
+        return buf.pop(0)
+    return _NAN
+
+
+def init_indicator_state(include_accumulation=False):
+    """빈 증분 상태 (봉 0개)"""
+    state = {
+        'stamp': indicator_code_stamp(),
+        'include_accumulation': bool(include_accumulation),
+        'rows': 0,
+        'last_date': None,
+        'prev': None,   # 직전 봉 {'open', 'close', 'body'}
+        'ma': {str(w): _mean_state(w, w) for w in (5, 20, 60, 200)},
+        'bb_std': _var_state(20),
+        'vol_avg': _mean_state(20, 20),
+        'avg_body': _mean_state(20, 5),
+        'ema_fast': _ewm_state(_span_com(12)),
+        'ema_slow': _ewm_state(_span_com(26)),
+        'macd_signal': _ewm_state(_span_com(9)),
+        'rsi_gain': _wilder_state(14),
+        'rsi_loss': _wilder_state(14),
+        'atr': _wilder_state(14),
+        'highs': [],
+        'lows': [],
+        'cloud_a': [],
+        'cloud_b': [],
+    }
+    if include_accumulation:
+        state['sde'] = {'history': []}
+    return state
+
+
+def _sde_push(st, i, daily_return, vr_raw):
+    """detect_shakeout_dryup_explosion의 봉 i 값 → (sde_signal, sde_shakeout_days)"""
+    vr = 1.0 if vr_raw != vr_raw else vr_raw
+    history = st['history']   # 직전 30봉 [세이크아웃 여부, vol_ratio 원값]
+    signal = days = 0
+    if i >= 30 and daily_return >= 0.05 and vr >= 2.0:
+        for offset in range(10, 31):
+            if i - offset < 1 or not history[-offset][0]:
+                continue
+            # 세이크아웃 다음날 ~ 폭발 전날 (원본과 같은 np.mean)
+            dry = [h[1] for h in history[len(history) - offset + 1:] if h[1] == h[1]]
+            if dry and np.mean(dry) < 1.0:
+                signal, days = 3, offset
+                break
+    history.append([bool(daily_return <= -0.04 and vr >= 1.5), vr_raw])
+    if len(history) > 30:
+        history.pop(0)
+    return signal, days
+
+
+def update_indicator_state(state, bar):
+    """
+    봉 하나 반영 → 그 봉의 지표 값 dict (calc_all_indicators 컬럼 순서)
+
+    bar: {'date', 'open', 'high', 'low', 'close', 'volume'} (dict 또는 같은 이름 속성의 행)
+    """
+    get = bar.get if isinstance(bar, dict) else lambda k: getattr(bar, k)
+    o, h, l, c, v = (float(get(k)) for k in ('open', 'high', 'low', 'close', 'volume'))
+    prev = state['prev']
+    pc = prev['close'] if prev else _NAN
+    row = {}
+
+    for w, st in state['ma'].items():
+        row[f'ma_{w}'] = _mean_push(st, c)
+
+    delta = c - pc
+    gain = _wilder_push(state['rsi_gain'], max(delta, 0.0) if delta == delta else _NAN)
+    loss = _wilder_push(state['rsi_loss'], max(-delta, 0.0) if delta == delta else _NAN)
+    row['rsi'] = 100 - _div(100.0, 1 + _div(gain, loss))
+
+    mid = row['ma_20']
+    std = _std_push(state['bb_std'], c)
+    row['bb_mid'] = mid
+    row['bb_upper'] = mid + 2 * std
+    row['bb_lower'] = mid - 2 * std
+
+    row['vol_avg'] = _mean_push(state['vol_avg'], v)
+    row['vol_ratio'] = _div(v, row['vol_avg'])
+
+    macd = _ewm_push(state['ema_fast'], c) - _ewm_push(state['ema_slow'], c)
+    row['macd'] = macd
+    row['macd_signal'] = _ewm_push(state['macd_signal'], macd)
+    row['macd_hist'] = macd - row['macd_signal']
+
+    body = c - o
+    body_abs = abs(body)
+    upper_shadow = h - max(o, c)
+    lower_shadow = min(o, c) - l
+    avg_body = _mean_push(state['avg_body'], body_abs)
+    prev_body = prev['body'] if prev else _NAN
+    prev_open = prev['open'] if prev else _NAN
+    row['is_hammer'] = (lower_shadow > 2 * body_abs and upper_shadow < body_abs * 0.5
+                        and body_abs > 0)
+    row['is_bullish_engulfing'] = body > 0 and prev_body < 0 and o <= pc and c >= prev_open
+    row['is_shooting_star'] = (upper_shadow > 2 * body_abs and lower_shadow < body_abs * 0.5
+                               and body_abs > 0)
+    row['is_bearish_engulfing'] = body < 0 and prev_body > 0 and o >= pc and c <= prev_open
+    row['is_doji'] = body_abs < avg_body * 0.1
+
+    highs, lows = state['highs'], state['lows']
+    highs.append(h)
+    lows.append(l)
+    if len(highs) > 52:
+        highs.pop(0)
+        lows.pop(0)
+    extremes = {}
+    for w in (9, 26, 52):
+        hi, _ = _window_extreme(highs, w)
+        _, lo = _window_extreme(lows, w)
+        extremes[w] = (hi + lo) / 2
+    row['ichi_tenkan'] = extremes[9]
+    row['ichi_kijun'] = extremes[26]
+    row['ichi_cloud_a'] = _lag_push(state['cloud_a'], (extremes[9] + extremes[26]) / 2, 26)
+    row['ichi_cloud_b'] = _lag_push(state['cloud_b'], extremes[52], 26)
+
+    tr = [x for x in (h - l, abs(h - pc), abs(l - pc)) if x == x]
+    row['atr_14'] = _wilder_push(state['atr'], max(tr) if tr else _NAN)
+
+    if state['include_accumulation']:
+        vol_ratio = row['vol_ratio']
+        change = abs(_div(c, pc) - 1) * 100
+        change = max(change, 0.1) if change == change else _NAN
+        vpd = vol_ratio / change
+        vpd = min(vpd, 20.0) if vpd == vpd else _NAN
+        row['vpd'] = vpd if vol_ratio >= 0.5 else 0.0
+        daily_return = (c - pc) / pc if pc > 0 else _NAN
+        row['sde_signal'], row['sde_shakeout_days'] = _sde_push(state['sde'], state['rows'],
+                                                                daily_return, vol_ratio)
+
+    state['prev'] = {'open': o, 'close': c, 'body': body}
+    state['rows'] += 1
+    state['last_date'] = str(pd.Timestamp(get('date')))
+    return row
+
+
+def indicator_state_from_df(df, include_accumulation=False):
+    """기존 OHLCV 이력 → 증분 상태 (최초 1회 전 봉을 순서대로 흘려 만듦)"""
+    state = init_indicator_state(include_accumulation)
+    for bar in df[BASE_COLUMNS].itertuples(index=False):
+        update_indicator_state(state, bar)
+    return state
+
+
+def append_bars(df, new_bars, state=None):
+    """
+    지표가 계산된 df 끝에 새 봉들을 붙이고 그 봉들의 지표만 계산
+
+    new_bars: OHLCV DataFrame (state['last_date'] 이전 봉은 이미 반영된 것으로 보고 건너뜀)
+    state:    df까지 반영된 증분 상태 (None = df 이력으로 새로 만듦)
+    Returns:
+        (df, state) — df는 calc_all_indicators(전체 OHLCV)와 같은 값·dtype
+    """
+    if state is None:
+        state = indicator_state_from_df(df, 'vpd' in df.columns)
+    if len(new_bars) and state['last_date'] is not None:
+        new_bars = new_bars[new_bars['date'] > pd.Timestamp(state['last_date'])]
+    if not len(new_bars):
+        return df, state
+
+    rows = []
+    for bar in new_bars[BASE_COLUMNS].itertuples(index=False):
+        row = {col: getattr(bar, col) for col in BASE_COLUMNS}
+        row.update(update_indicator_state(state, bar))
+        rows.append(row)
+    added = pd.DataFrame(rows)
+    added = added.astype({col: df[col].dtype for col in added.columns if col in df.columns})
+    return pd.concat([df, added], ignore_index=True), state
+
+
+def save_indicator_state(state, path):
+    """증분 상태 → JSON 파일 (원자적 교체)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def load_indicator_state(path):
+    """저장된 증분 상태 (없거나 손상됐거나 지표 코드가 바뀌었으면 None → 다시 부트스트랩)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('stamp') == indicator_code_stamp() else None
+
+
+# ─────────────────────────────────────────────────────────────
+# 지표 캐시 — 데이터 지문 + 파라미터 + 코드 버전으로 키 생성
+# ─────────────────────────────────────────────────────────────
+_code_stamp = None
+
+# 지표 값에 영향을 주는 소스 파일 (이 파일 + 롤링 최대/최소를 제공하는 range_index)
+INDICATOR_SOURCE_FILES = [
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'range_index.py'),
+]
+
+
+def indicator_code_stamp():
+    """지표 코드 버전 스탬프 (INDICATOR_VERSION + 지표 계산에 쓰이는 소스 파일 해시)"""
+    global _code_stamp
+    if _code_stamp is None:
+        h = hashlib.blake2b(digest_size=8)
+        for path in INDICATOR_SOURCE_FILES:
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        _code_stamp = f'v{INDICATOR_VERSION}-{h.hexdigest()}'
+    return _code_stamp
+
+
+def data_fingerprint(df):
+    """OHLCV 원본 데이터 지문 (날짜 + 시고저종 + 거래량 바이트 해시)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(df)).encode())
+    for col in BASE_COLUMNS:
+        h.update(np.ascontiguousarray(df[col].to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+def _indicator_cache_key(df, params):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(data_fingerprint(df).encode())
+    h.update(repr(sorted(params.items())).encode())
+    h.update(indicator_code_stamp().encode())
+    return h.hexdigest()
+
+
+def _enforce_cache_limit(cache_dir, max_bytes):
+    """캐시 디렉토리 총 크기가 상한을 넘으면 오래 안 쓴 파일부터 삭제 (LRU)"""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for e in it:
+            if e.is_file() and e.name.endswith('.npz'):
+                st = e.stat()
+                entries.append((st.st_mtime_ns, st.st_size, e.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def calc_all_indicators_cached(df, include_accumulation=False, cache_dir=None,
+                               max_bytes=INDICATOR_CACHE_MAX_BYTES):
+    """
+    calc_all_indicators + 디스크 캐시 (결과 동일)
+
+    캐시 키 = 데이터 지문 + 지표 파라미터 + 코드 버전 스탬프
+    → 데이터나 파라미터, 지표 코드가 바뀐 종목만 재계산
+    적중 시 파일 mtime을 갱신해 LRU 순서 유지, 저장 후 max_bytes 초과분 정리
+    """
+    cache_dir = cache_dir or INDICATOR_CACHE_DIR
+    params = {'include_accumulation': bool(include_accumulation)}
+    path = os.path.join(cache_dir, _indicator_cache_key(df, params) + '.npz')
+
+    if os.path.exists(path):
+        try:
+            with np.load(path, allow_pickle=False) as cached:
+                loaded = {col: cached[col] for col in cached.files}
+            os.utime(path)
+            for col, values in loaded.items():
+                df[col] = values
+            return df
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass   # 손상된 캐시 → 재계산
+
+    before = set(df.columns)
+    df = calc_all_indicators(df, include_accumulation=include_accumulation)
+    computed = {col: df[col].to_numpy() for col in df.columns if col not in before}
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, **computed)
+        os.replace(tmp, path)
+        _enforce_cache_limit(cache_dir, max_bytes)
+    except OSError:
+        pass
+    return df
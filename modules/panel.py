@@ -0,0 +1,252 @@
+"""
+유니버스 패널 — 종목별 DataFrame을 공통 거래일 × 종목 2차원 배열로 정렬
+
+    panel = {
+        'dates':   (T,) datetime64 — 전 종목 날짜의 합집합 (정렬)
+        'symbols': [종목코드] (N개, 열 순서)
+        'names':   [종목명]
+        'valid':   (T, N) bool — 해당 날짜에 그 종목 봉이 있으면 True (상장 전/정지일 False)
+        'fields':  {컬럼명: (T, N) float64 배열} — 봉이 없는 칸은 NaN
+    }
+
+배열은 날짜 행 우선(C order)이라 하루치 전 종목 값이 연속 메모리 → 일자별 단면 처리에 유리
+
+디스크 저장 (.cache/panel/<키>/):
+    meta.json + dates.npy + valid.npy + 필드별 .npy
+    load_panel은 np.load(mmap_mode='r')로 매핑 → 여러 프로세스가 OS 페이지 캐시 한 벌을 공유
+    build_panel(out_dir=...)은 처음부터 메모리 매핑 파일에 기록 (전 필드를 RAM에 올리지 않음)
+"""
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from modules.indicators import indicator_code_stamp
+from modules.universe import list_xml_files, load_universe
+
+
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+PANEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               '.cache', 'panel')
+PANEL_VERSION = 1
+
+
+def union_calendar(frames):
+    """여러 DataFrame 날짜의 합집합 (정렬된 datetime64[ns])"""
+    if not frames:
+        return np.empty(0, dtype='M8[ns]')
+    return np.unique(np.concatenate([df['date'].to_numpy().astype('M8[ns]') for df in frames]))
+
+
+def _calendar_positions(dates, d):
+    """날짜 배열 d의 달력 위치와 달력에 있는지 여부"""
+    pos = np.searchsorted(dates, d)
+    if len(dates) == 0:
+        return pos, np.zeros(len(d), dtype=bool)
+    inside = (pos < len(dates)) & (dates[np.minimum(pos, len(dates) - 1)] == d)
+    return pos, inside
+
+
+def numeric_columns(frames):
+    """전 종목 숫자형 컬럼의 합집합 (첫 등장 순서, date 제외)"""
+    columns = {}
+    for df in frames:
+        for col in df.columns:
+            if col != 'date' and pd.api.types.is_numeric_dtype(df[col].dtype):
+                columns.setdefault(col, None)
+    return list(columns)
+
+
+def _field_file(i):
+    return f'f{i:03d}.npy'
+
+
+def _allocate(out_dir, filename, shape, dtype, fill):
+    """out_dir이 있으면 메모리 매핑 .npy 파일, 없으면 일반 배열"""
+    if out_dir is None:
+        return np.full(shape, fill, dtype=dtype)
+    arr = np.lib.format.open_memmap(os.path.join(out_dir, filename), mode='w+',
+                                    dtype=dtype, shape=shape)
+    arr[...] = fill
+    return arr
+
+
+def build_panel(stocks, fields=None, dates=None, out_dir=None, source=None):
+    """
+    종목 리스트 → 패널
+
+    stocks:  [{'symbol', 'name', 'df'}, ...] (load_universe 결과)
+    fields:  패널로 만들 컬럼 (None = OHLCV, 'all' = 숫자형 컬럼 전체, 종목에 없는 컬럼은 NaN)
+    dates:   공통 달력 (None = 전 종목 날짜 합집합)
+    out_dir: 지정하면 배열을 이 디렉토리의 메모리 매핑 파일로 만들어 바로 저장
+             (load_panel로 다시 열 수 있음)
+    source:  저장 시 meta.json에 함께 기록할 출처 정보 (캐시 검증용)
+    """
+    frames = [s['df'] for s in stocks]
+    if fields == 'all':
+        fields = numeric_columns(frames)
+    fields = list(fields or PRICE_FIELDS)
+    dates = union_calendar(frames) if dates is None else np.asarray(dates).astype('M8[ns]')
+    T, N = len(dates), len(stocks)
+
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    valid = _allocate(out_dir, 'valid.npy', (T, N), bool, False)
+    arrays = {f: _allocate(out_dir, _field_file(i), (T, N), np.float64, np.nan)
+              for i, f in enumerate(fields)}
+    for j, df in enumerate(frames):
+        pos, inside = _calendar_positions(dates, df['date'].to_numpy().astype('M8[ns]'))
+        pos = pos[inside]
+        valid[pos, j] = True
+        for f in fields:
+            if f in df.columns:
+                arrays[f][pos, j] = df[f].to_numpy(dtype=float)[inside]
+
+    panel = {
+        'dates': dates,
+        'symbols': [s['symbol'] for s in stocks],
+        'names': [s['name'] for s in stocks],
+        'valid': valid,
+        'fields': arrays,
+    }
+    if out_dir is not None:
+        for arr in [valid] + list(arrays.values()):
+            arr.flush()
+        _write_meta(out_dir, panel, source or {})
+    return panel
+
+
+def align_to_panel(panel, values, df_dates):
+    """종목 하나의 봉별 배열을 패널 달력 위치에 맞춘 (T,) 배열로 (없는 날 NaN)"""
+    dates = panel['dates']
+    out = np.full(len(dates), np.nan)
+    pos, inside = _calendar_positions(dates, np.asarray(df_dates).astype('M8[ns]'))
+    out[pos[inside]] = np.asarray(values, dtype=float)[inside]
+    return out
+
+
+# ─────────────────────────────────────────────────────────────
+# 단면 / 종목 조회
+# ─────────────────────────────────────────────────────────────
+def panel_frame(panel, field):
+    """필드 하나 → DataFrame (행 = 날짜, 열 = 종목코드, 무복사)"""
+    return pd.DataFrame(panel['fields'][field], index=pd.DatetimeIndex(panel['dates']),
+                        columns=panel['symbols'], copy=False)
+
+
+def stock_frame(panel, symbol, fields=None):
+    """패널 → 종목 하나의 DataFrame (봉이 있는 날짜만, date + 필드 컬럼)"""
+    j = panel['symbols'].index(symbol)
+    rows = np.flatnonzero(panel['valid'][:, j])
+    data = {'date': panel['dates'][rows]}
+    for f in fields or panel['fields']:
+        data[f] = panel['fields'][f][rows, j]
+    return pd.DataFrame(data)
+
+
+# ─────────────────────────────────────────────────────────────
+# 저장 / 로드 (메모리 매핑)
+# ─────────────────────────────────────────────────────────────
+def _write_meta(out_dir, panel, source):
+    np.save(os.path.join(out_dir, 'dates.npy'), np.asarray(panel['dates']).astype('M8[ns]'))
+    meta = {
+        'version': PANEL_VERSION,
+        'symbols': list(panel['symbols']),
+        'names': list(panel['names']),
+        'fields': {f: _field_file(i) for i, f in enumerate(panel['fields'])},
+        'shape': list(panel['valid'].shape),
+        'source': source,
+    }
+    tmp = os.path.join(out_dir, f'meta.json.{os.getpid()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(out_dir, 'meta.json'))   # meta.json이 마지막 → 있으면 완성본
+
+
+def save_panel(panel, out_dir, source=None):
+    """메모리의 패널 → out_dir (필드별 .npy + meta.json)"""
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, 'valid.npy'), np.asarray(panel['valid']))
+    for i, arr in enumerate(panel['fields'].values()):
+        np.save(os.path.join(out_dir, _field_file(i)), np.asarray(arr, dtype=np.float64))
+    _write_meta(out_dir, panel, source or {})
+
+
+def read_panel_meta(out_dir):
+    """저장된 패널의 meta.json (없거나 버전이 다르면 None)"""
+    try:
+        with open(os.path.join(out_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == PANEL_VERSION else None
+
+
+def load_panel(out_dir, fields=None, mmap_mode='r'):
+    """
+    저장된 패널 열기
+
+    fields:    열 필드 (None = 전체)
+    mmap_mode: 'r' = 읽기 전용 매핑 (기본, 프로세스 간 공유), 'c' = copy-on-write, None = 메모리로 읽기
+    """
+    meta = read_panel_meta(out_dir)
+    if meta is None:
+        raise FileNotFoundError(f'패널 없음: {out_dir}')
+    names = list(meta['fields']) if fields is None else list(fields)
+    return {
+        'dates': np.load(os.path.join(out_dir, 'dates.npy')),
+        'symbols': meta['symbols'],
+        'names': meta['names'],
+        'valid': np.load(os.path.join(out_dir, 'valid.npy'), mmap_mode=mmap_mode),
+        'fields': {f: np.load(os.path.join(out_dir, meta['fields'][f]), mmap_mode=mmap_mode)
+                   for f in names},
+    }
+
+
+def _xml_source(xml_dir, files, fields, include_accumulation, min_rows):
+    """XML 디렉토리 패널의 캐시 검증 정보 (파일 크기·mtime + 지표 코드 스탬프 + 빌드 인자)"""
+    stats = []
+    for name in files:
+        st = os.stat(os.path.join(xml_dir, name))
+        stats.append([name, st.st_size, st.st_mtime_ns])
+    return {
+        'xml_dir': os.path.abspath(xml_dir),
+        'files': stats,
+        'fields': fields,
+        'include_accumulation': bool(include_accumulation),
+        'min_rows': min_rows,
+        'indicators': indicator_code_stamp(),
+    }
+
+
+def build_panel_from_xml(xml_dir, fields='all', include_accumulation=False, workers=None,
+                         exclude=('KOSPI.xml',), min_rows=0, cache_dir=None, rebuild=False):
+    """
+    XML 디렉토리 → 메모리 매핑 패널 (.cache/panel에 저장, 다음 실행부터 바로 매핑)
+
+    종목 로드는 load_universe(파싱·지표 캐시 사용) → 바뀐 파일만 다시 파싱/계산.
+    XML 파일 목록·크기·mtime, 지표 코드, 인자가 같으면 저장된 패널을 그대로 열고
+    하나라도 다르면 다시 빌드
+    Returns:
+        (panel, failures) — failures는 load_universe와 같은 [(파일명, 에러)] (캐시 적중 시 [])
+    """
+    files = list_xml_files(xml_dir, exclude)
+    source = _xml_source(xml_dir, files, fields, include_accumulation, min_rows)
+    # 디렉토리 키 = 빌드 인자 (파일이 바뀌면 같은 디렉토리에 덮어씀)
+    key_args = {k: source[k] for k in ('xml_dir', 'fields', 'include_accumulation', 'min_rows')}
+    key = hashlib.blake2b(json.dumps(key_args, sort_keys=True).encode('utf-8'),
+                          digest_size=10).hexdigest()
+    out_dir = os.path.join(cache_dir or PANEL_CACHE_DIR, key)
+
+    meta = read_panel_meta(out_dir)
+    if meta is not None and meta['source'] == source and not rebuild:
+        return load_panel(out_dir), []
+
+    stocks, failures = load_universe(xml_dir, include_accumulation, workers, exclude, min_rows)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    build_panel(stocks, fields, out_dir=out_dir, source=source)
+    return load_panel(out_dir), failures
@@ -0,0 +1,297 @@
+"""
+포트폴리오 백테스트 — 전 종목을 공통 거래일 기준으로 하루씩 동시에 진행
+
+run_backtest는 종목마다 따로 시뮬레이션하므로 자금 제약/동시 보유 한도가 없음.
+여기서는 패널(modules.panel) 배열 위에서:
+    - 자본금 한도, 최대 동시 보유 종목 수, 종목당 투입 비율
+    - 신호가 빈 슬롯보다 많으면 스코어 상위 종목부터 주문
+    - 비용 모델은 run_backtest와 동일 (청산 시 ROUND_TRIP_COST 차감)
+
+하루 처리 순서 (t일):
+    1. 보유 종목 청산 체크 — max_hold 만기(종가) → TP/SL (동시 터치 시 시가로 판정, 애매하면 손절)
+    2. 전날 낸 지정가 주문 체결 — 시가 <= 지정가면 시가, 저가 <= 지정가면 지정가, 아니면 취소
+    3. 종가 기준 평가금액 기록
+    4. 신규 신호 → 빈 슬롯 수만큼 스코어 순으로 다음날 지정가 주문 (주문 금액은 현금에서 예약)
+거래정지/상장 전(봉 없음) 종목은 그날 청산·체결하지 않고, 대기 주문은 취소
+"""
+import numpy as np
+
+from modules.backtester import (compute_signal_arrays, calc_dynamic_price_arrays, ROUND_TRIP_COST,
+                                CIRCUIT_BREAKER_LOSSES, CIRCUIT_BREAKER_EXTRA)
+from modules.panel import build_panel
+from modules.regime_filter import regime_series
+from modules.trade_log import TRADE_DTYPE, RESULT_WIN, RESULT_LOSS, RESULT_OPEN, summarize_trade_array
+
+
+SIGNAL_FIELDS = ['open', 'high', 'low', 'close', 'atr_14', 'ichi_kijun']
+
+
+def build_signal_panel(stocks, buy_threshold=4.0, benford_window=30, profile_name='default',
+                       benford_influence=0.15, benford_min_hits=5, rsi_min=70,
+                       mode='momentum', use_regime_filter=True, atr_tp_mult=3.0):
+    """
+    종목 리스트 → 포트폴리오용 패널 (가격 + 손절 입력 + 스코어/진입 후보/가격 레벨)
+
+    추가 필드:
+        score:    봉별 스코어
+        eligible: 진입 후보 여부 (1.0/0.0 — 스코어·RSI 필터 + 약세장 제외)
+        limit:    다음날 지정가 (momentum: calc_dynamic_price_arrays 기준선/MA20/종가, accumulation: 종가)
+        tp_level: 동적 목표가 (없으면 NaN → 체결가 × (1 + take_profit))
+        atr_sl:   손절용 ATR (신호 봉, 없으면 NaN)
+    가격 레벨은 진입 후보 봉에만 채우고 나머지 칸은 NaN
+    """
+    panel = build_panel(stocks, SIGNAL_FIELDS)
+    T, N = panel['valid'].shape
+    score = np.full((T, N), np.nan)
+    eligible = np.zeros((T, N))
+    limit = np.full((T, N), np.nan)
+    tp_level = np.full((T, N), np.nan)
+    atr_sl = np.full((T, N), np.nan)
+    for j, s in enumerate(stocks):
+        df = s['df']
+        sig = compute_signal_arrays(df, buy_threshold, benford_window, profile_name,
+                                    benford_influence, benford_min_hits, rsi_min, mode)
+        ok = sig['eligible']
+        if use_regime_filter and ok.any():
+            ok = ok & (regime_series(df['date'].to_numpy()) != 2)
+
+        pos = np.searchsorted(panel['dates'], df['date'].to_numpy().astype('M8[ns]'))
+        score[pos, j] = sig['scores']
+        eligible[pos, j] = ok
+        rows = pos[ok]
+        if mode == 'accumulation':
+            limit[rows, j] = df['close'].to_numpy(dtype=float)[ok]
+            continue
+        prices = calc_dynamic_price_arrays(df, atr_tp_mult)
+        limit[rows, j] = prices['pending_limit'][ok]
+        tp_level[rows, j] = prices['tp_level'][ok]
+        atr_sl[rows, j] = prices['atr'][ok]
+    panel['fields'].update(score=score, eligible=eligible, limit=limit,
+                           tp_level=tp_level, atr_sl=atr_sl)
+    return panel
+
+
+def run_portfolio(panel, initial_capital=10_000_000, max_positions=5, position_size=None,
+                  take_profit=0.17, stop_loss=0.07, cooldown=5, max_hold=0,
+                  atr_sl_mult=2.0, mode='momentum'):
+    """
+    포트폴리오 시뮬레이션
+
+    Parameters:
+        panel:         build_signal_panel 결과 (open/high/low/close/score/eligible/limit 필드,
+                       선택: tp_level, atr_sl, ichi_kijun)
+        max_positions: 최대 동시 보유(+대기 주문) 종목 수
+        position_size: 종목당 투입 비율 (당일 평가금액 대비, None = 1/max_positions)
+        take_profit / stop_loss / cooldown:
+                       전 종목 공통 값 또는 종목별 배열 (길이 N, 패널 열 순서 — 종목별 최적화 결과)
+        cooldown:      같은 종목 신호 간 최소 간격 (패널 거래일, 연속 손절 시 서킷브레이커 가산)
+        max_hold:      최대 보유일 (달력일, 0=무제한)
+        mode:          'momentum' 손절 = max(고정%, 기준선-3%, 진입가-ATR×배수)
+                       'accumulation' 손절 = 고정%만, 목표가 = 지정가 × (1 + take_profit)
+    종목 하나·자금 무제한이면 run_backtest와 같은 거래가 나옴
+
+    Returns:
+        dict {
+          'dates', 'equity'(일별 평가금액), 'cash'(일별 현금),
+          'trades': trade_log 구조화 배열 (진입일 순, symbol = 패널 열 번호),
+          'shares': 거래별 수량 (trades와 같은 순서),
+          'summary': summarize_trades 형식 요약,
+          'final_equity', 'total_return_pct', 'cagr_pct', 'max_drawdown_pct', 'exposure_pct'
+        }
+    """
+    f = panel['fields']
+    dates = panel['dates']
+    O, H, L, C = f['open'], f['high'], f['low'], f['close']
+    score, eligible, limit = f['score'], f['eligible'] > 0, f['limit']
+    tp_level = f.get('tp_level')
+    atr_sl = f.get('atr_sl')
+    kijun = f.get('ichi_kijun')
+    T, N = C.shape
+    K = max_positions
+    take_profit = np.broadcast_to(np.asarray(take_profit, dtype=float), N)
+    stop_loss = np.broadcast_to(np.asarray(stop_loss, dtype=float), N)
+    cooldown = np.broadcast_to(np.asarray(cooldown, dtype=np.int64), N)
+    position_size = position_size or 1.0 / K
+    day_ord = dates.astype('M8[D]').astype(np.int64)
+    date_ns = dates.astype('M8[ns]').astype(np.int64)
+    # 종목별 마지막 봉 (상장폐지/데이터 끝 → 보유분 OPEN 처리)
+    valid = panel['valid']
+    last_row = np.where(valid.any(axis=0), T - 1 - np.argmax(valid[::-1], axis=0), -1)
+
+    # 슬롯 상태: 0 = 빈 슬롯, 1 = 지정가 주문 대기, 2 = 보유
+    slot_state = np.zeros(K, dtype=np.int8)
+    slot_sym = np.zeros(K, dtype=np.int64)
+    slot_shares = np.zeros(K)
+    slot_limit = np.zeros(K)
+    slot_tp_level = np.full(K, np.nan)
+    slot_atr = np.full(K, np.nan)             # 신호 봉 ATR (손절용)
+    slot_entry = np.zeros(K)
+    slot_target = np.zeros(K)
+    slot_stop = np.zeros(K)
+    slot_entry_t = np.zeros(K, dtype=np.int64)
+    slot_score = np.zeros(K)
+
+    busy = np.zeros(N, dtype=bool)              # 보유 중이거나 주문 대기 중인 종목
+    last_signal = np.full(N, -(1 << 40), dtype=np.int64)
+    consec_losses = np.zeros(N, dtype=np.int64)
+    last_close = np.full(N, np.nan)
+    cash = float(initial_capital)
+    reserved = 0.0                              # 대기 주문에 묶인 현금
+    equity = np.empty(T)
+    cash_curve = np.empty(T)
+    invested = np.empty(T)
+    trades = []
+    trade_shares = []
+
+    def close_slot(k, t, exit_price, result):
+        nonlocal cash
+        sym = slot_sym[k]
+        entry = slot_entry[k]
+        shares = slot_shares[k]
+        cash += shares * exit_price - shares * entry * ROUND_TRIP_COST
+        return_pct = ((exit_price - entry) / entry - ROUND_TRIP_COST) * 100
+        if result is None:
+            result = RESULT_WIN if return_pct > 0 else RESULT_LOSS
+        et = slot_entry_t[k]
+        trades.append((sym, -1, date_ns[et], date_ns[t],
+                       int(entry), int(exit_price), int(slot_target[k]), int(slot_stop[k]),
+                       round(slot_score[k], 2), result, round(return_pct, 2),
+                       int(day_ord[t] - day_ord[et])))
+        trade_shares.append(shares)
+        consec_losses[sym] = consec_losses[sym] + 1 if result == RESULT_LOSS else 0
+        slot_state[k] = 0
+        busy[sym] = False
+        exited[sym] = True
+
+    for t in range(T):
+        o, h, l, c = O[t], H[t], L[t], C[t]
+        exited = np.zeros(N, dtype=bool)        # 오늘 청산한 종목은 내일부터 신호 탐색
+
+        # ── 1. 보유 종목 청산 ──
+        held = np.flatnonzero(slot_state == 2)
+        if len(held):
+            s = slot_sym[held]
+            stop, target = slot_stop[held], slot_target[held]
+            if max_hold > 0:
+                expire = ~np.isnan(c[s]) & (day_ord[t] - day_ord[slot_entry_t[held]] >= max_hold)
+            else:
+                expire = np.zeros(len(held), dtype=bool)
+            hit_stop = l[s] <= stop
+            hit_target = h[s] >= target
+            # 동시 터치: 시가 <= 손절가면 손절, 시가 >= 목표가면 익절, 나머지는 손절 (run_backtest와 동일)
+            take = hit_target & ~hit_stop | hit_target & (o[s] >= target) & ~(o[s] <= stop)
+            for i in np.flatnonzero(expire | hit_stop | hit_target):
+                if expire[i]:
+                    close_slot(held[i], t, c[s[i]], None)
+                elif take[i]:
+                    close_slot(held[i], t, target[i], RESULT_WIN)
+                else:
+                    close_slot(held[i], t, stop[i], RESULT_LOSS)
+
+        # ── 2. 지정가 주문 체결 ──
+        pend = np.flatnonzero(slot_state == 1)
+        if len(pend):
+            s = slot_sym[pend]
+            lim = slot_limit[pend]
+            fill = np.where(o[s] <= lim, o[s], np.where(l[s] <= lim, lim, np.nan))
+            reserved -= float(np.sum(slot_shares[pend] * lim))
+            for i, k in enumerate(pend):
+                if np.isnan(fill[i]):
+                    slot_state[k] = 0          # 미체결 → 주문 소멸 (당일 신호 재탐색 가능)
+                    busy[s[i]] = False
+                    continue
+                fp = fill[i]
+                tp, sl = take_profit[s[i]], stop_loss[s[i]]
+                cash -= slot_shares[k] * fp
+                tpl = slot_tp_level[k]
+                slot_target[k] = tpl if tpl > fp * 1.03 else fp * (1 + tp)
+                if mode == 'accumulation':
+                    slot_stop[k] = fp * (1 - sl)
+                else:
+                    stops = [fp * (1 - sl)]
+                    kj = kijun[t, s[i]] if kijun is not None else np.nan   # 체결 봉 기준선
+                    if kj > 0 and kj * 0.97 < fp:
+                        stops.append(kj * 0.97)
+                    a = slot_atr[k]
+                    if a > 0 and 0 < fp - a * atr_sl_mult < fp:
+                        stops.append(fp - a * atr_sl_mult)
+                    slot_stop[k] = max(stops)
+                slot_entry[k] = fp
+                slot_entry_t[k] = t
+                slot_state[k] = 2
+
+        # 마지막 봉을 지난 종목 보유분 → 그 종가로 OPEN 처리
+        np.copyto(last_close, c, where=~np.isnan(c))
+        for k in np.flatnonzero(slot_state == 2):
+            if last_row[slot_sym[k]] == t:
+                close_slot(k, t, last_close[slot_sym[k]], RESULT_OPEN)
+
+        # ── 3. 평가 ──
+        held = np.flatnonzero(slot_state == 2)
+        market_value = float(np.sum(slot_shares[held] * last_close[slot_sym[held]])) if len(held) else 0.0
+        equity[t] = cash + market_value
+        cash_curve[t] = cash
+        invested[t] = market_value
+
+        # ── 4. 신규 신호 → 다음날 지정가 주문 ──
+        free = np.flatnonzero(slot_state == 0)
+        if len(free) == 0 or t == T - 1:
+            continue
+        cand = eligible[t] & ~busy & ~exited
+        if not cand.any():
+            continue
+        effective_cooldown = np.where(consec_losses >= CIRCUIT_BREAKER_LOSSES,
+                                      cooldown + CIRCUIT_BREAKER_EXTRA, cooldown)
+        cand = np.flatnonzero(cand & (t - last_signal >= effective_cooldown))
+        if len(cand) == 0:
+            continue
+        cand = cand[np.argsort(-score[t, cand], kind='stable')]   # 스코어 순 (동점은 열 순서)
+        budget = equity[t] * position_size
+        for sym in cand:
+            if len(free) == 0:
+                break
+            lim = limit[t, sym]
+            if not lim > 0:
+                continue
+            shares = np.floor(min(budget, cash - reserved) / lim)
+            if shares <= 0:
+                continue   # 이 종목 1주도 못 삼 → 더 싼 종목 시도
+            k = free[0]
+            free = free[1:]
+            slot_state[k] = 1
+            slot_sym[k] = sym
+            slot_shares[k] = shares
+            slot_limit[k] = lim
+            if mode == 'accumulation':
+                slot_tp_level[k] = lim * (1 + take_profit[sym])
+            else:
+                slot_tp_level[k] = tp_level[t, sym] if tp_level is not None else np.nan
+            slot_atr[k] = atr_sl[t, sym] if atr_sl is not None else np.nan
+            slot_score[k] = score[t, sym]
+            reserved += shares * lim
+            busy[sym] = True
+            last_signal[sym] = t
+
+    trade_arr = np.array(trades, dtype=TRADE_DTYPE) if trades else np.empty(0, dtype=TRADE_DTYPE)
+    order = np.argsort(trade_arr['entry_date'], kind='stable')
+    trade_arr = trade_arr[order]
+    shares_arr = np.array(trade_shares)[order] if trades else np.empty(0)
+
+    final_equity = float(equity[-1]) if T else float(initial_capital)
+    years = (day_ord[-1] - day_ord[0]) / 365.25 if T > 1 else 0
+    if T:
+        drawdown = (equity / np.maximum.accumulate(equity) - 1) * 100
+        exposure = invested / np.where(equity > 0, equity, np.nan)
+    return {
+        'dates': dates,
+        'equity': equity,
+        'cash': cash_curve,
+        'trades': trade_arr,
+        'shares': shares_arr,
+        'summary': summarize_trade_array(trade_arr),
+        'final_equity': final_equity,
+        'total_return_pct': (final_equity / initial_capital - 1) * 100,
+        'cagr_pct': ((final_equity / initial_capital) ** (1 / years) - 1) * 100 if years > 0 else 0.0,
+        'max_drawdown_pct': float(drawdown.min()) if T else 0.0,
+        'exposure_pct': float(np.nanmean(exposure) * 100) if T else 0.0,
+    }
@@ -0,0 +1,192 @@
+"""
+구간 질의 인덱스 — 임의 구간 [i, j]의 최대/최소/평균을 O(1)에
+
+"최근 N봉 고가 최대 / 저가 최소"가 엔진 곳곳에서 df.iloc[...].max()로 매번 다시 계산됨:
+    calculate_buy_score (20일 고점), _calc_dynamic_prices (120/52봉 전고점),
+    calculate_accumulation_score (20봉 레인지·평균가, 10봉 거래량 평균),
+    calc_regime_series (250봉 52주 고점), calc_ichimoku (9/26/52 고저)
+
+    최대/최소: 희소 테이블(sparse table) table[k][i] = op(values[i : i + 2^k])
+               → [i, j]는 길이 2^k 블록 두 개(겹쳐도 무방)로 한 번에
+    평균:      누적합 + 유효값 개수 누적합 (정수 컬럼은 정수 누적이라 오차 없음)
+NaN은 pandas처럼 건너뜀 (fmax/fmin, 구간 전체가 NaN이면 NaN)
+
+range_index_for(df): 종목 DataFrame별 인덱스를 만들어 두고 재사용
+    (같은 df 객체·같은 컬럼 메모리면 캐시 적중 → 봉별 스코어 함수에서 호출해도 종목당 1회 빌드)
+rolling_max / rolling_min / rolling_mean: 고정 창 전체를 벡터로 (pandas rolling과 같은 결과)
+"""
+import weakref
+
+import numpy as np
+
+
+RANGE_COLUMNS = {
+    'max': ('high',),
+    'min': ('low',),
+    'mean': ('close', 'volume'),
+}
+
+# id(df) → (df 약참조, 컬럼 메모리 주소, 인덱스)
+_index_cache = {}
+
+
+def sparse_table(values, op, levels=None):
+    """table[k][i] = op(values[i : i + 2^k])  (범위를 벗어나는 꼬리는 마지막 값 유지)
+
+    levels: 만들 최대 단계 k (None = 전체 길이까지)
+    """
+    n = len(values)
+    table = [values]
+    k = 1
+    while (1 << k) <= n and (levels is None or k <= levels):
+        prev = table[-1]
+        half = 1 << (k - 1)
+        cur = prev.copy()
+        cur[:n - half] = op(prev[:n - half], prev[half:])
+        table.append(cur)
+        k += 1
+    return np.array(table)
+
+
+def _prefix(values):
+    """(값 누적합, 유효값 개수 누적합) — 길이 n+1, 정수 배열은 int64로 정확히 누적"""
+    if values.dtype.kind in 'iub':
+        total = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(values, out=total[1:])
+        count = np.arange(len(values) + 1, dtype=np.int64)
+    else:
+        values = values.astype(float)
+        nan = np.isnan(values)
+        total = np.zeros(len(values) + 1)
+        np.cumsum(np.where(nan, 0.0, values), out=total[1:])
+        count = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(~nan, out=count[1:])
+    return total, count
+
+
+def build_range_index(df, columns=None):
+    """
+    종목 DataFrame → 구간 질의 인덱스 dict
+
+    columns: {'max': [컬럼], 'min': [컬럼], 'mean': [컬럼]} (None = RANGE_COLUMNS, 없는 컬럼은 건너뜀)
+    """
+    columns = columns or RANGE_COLUMNS
+    index = {'n': len(df), 'max': {}, 'min': {}, 'mean': {}}
+    for col in columns.get('max', ()):
+        if col in df.columns:
+            index['max'][col] = sparse_table(df[col].to_numpy(dtype=float), np.fmax)
+    for col in columns.get('min', ()):
+        if col in df.columns:
+            index['min'][col] = sparse_table(df[col].to_numpy(dtype=float), np.fmin)
+    for col in columns.get('mean', ()):
+        if col in df.columns:
+            index['mean'][col] = _prefix(df[col].to_numpy())
+    return index
+
+
+def _column_addresses(df, columns):
+    return tuple(df[col].to_numpy().__array_interface__['data'][0] if col in df.columns else None
+                 for col in columns)
+
+
+def range_index_for(df):
+    """
+    df용 인덱스 (캐시) — 같은 DataFrame 객체이고 질의 컬럼 메모리가 그대로면 재사용
+
+    컬럼 값을 제자리에서 고친 경우는 감지하지 못하므로 build_range_index로 새로 만들 것
+    """
+    key = id(df)
+    cols = sorted({c for cs in RANGE_COLUMNS.values() for c in cs})
+    addresses = (len(df),) + _column_addresses(df, cols)
+    cached = _index_cache.get(key)
+    if cached is not None and cached[0]() is df and cached[1] == addresses:
+        return cached[2]
+    index = build_range_index(df)
+    _index_cache[key] = (weakref.ref(df, lambda _, key=key: _index_cache.pop(key, None)),
+                         addresses, index)
+    return index
+
+
+# ─────────────────────────────────────────────────────────────
+# 구간 질의 (i, j 양끝 포함)
+# ─────────────────────────────────────────────────────────────
+def _query(table, i, j, op):
+    i, j = int(i), int(j)
+    k = (j - i + 1).bit_length() - 1
+    return op(table[k][i], table[k][j - (1 << k) + 1])
+
+
+def range_max(index, col, i, j):
+    """max(values[i..j]) — 빈 구간(i > j)이면 NaN"""
+    if i > j:
+        return np.nan
+    return _query(index['max'][col], i, j, np.fmax)
+
+
+def range_min(index, col, i, j):
+    """min(values[i..j]) — 빈 구간(i > j)이면 NaN"""
+    if i > j:
+        return np.nan
+    return _query(index['min'][col], i, j, np.fmin)
+
+
+def range_mean(index, col, i, j):
+    """mean(values[i..j]) (NaN 제외) — 유효값이 없으면 NaN"""
+    total, count = index['mean'][col]
+    i, j = int(i), int(j)
+    c = count[j + 1] - count[i] if i <= j else 0
+    if c == 0:
+        return np.nan
+    return (total[j + 1] - total[i]) / c
+
+
+# ─────────────────────────────────────────────────────────────
+# 고정 창 롤링 (pandas rolling(window, min_periods) 대체)
+# ─────────────────────────────────────────────────────────────
+def _window_counts(values, window):
+    """봉별 창 안 유효값 개수"""
+    valid = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(~np.isnan(values), out=valid[1:])
+    ends = np.arange(1, len(values) + 1)
+    return valid[ends] - valid[np.maximum(ends - window, 0)]
+
+
+def _rolling_extreme(values, window, min_periods, op):
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    min_periods = window if min_periods is None else min_periods
+    out = np.empty(n)
+    head = min(window - 1, n)
+    out[:head] = op.accumulate(values[:head])   # 창이 다 차기 전 = 처음부터 누적
+    if n >= window:
+        k = window.bit_length() - 1
+        table = sparse_table(values, op, levels=k)[k]
+        j = np.arange(window - 1, n)
+        out[window - 1:] = op(table[j - window + 1], table[j - (1 << k) + 1])
+    out[_window_counts(values, window) < max(min_periods, 1)] = np.nan
+    return out
+
+
+def rolling_max(values, window, min_periods=None):
+    """pandas Series(values).rolling(window, min_periods).max()와 같은 배열"""
+    return _rolling_extreme(values, window, min_periods, np.fmax)
+
+
+def rolling_min(values, window, min_periods=None):
+    """pandas Series(values).rolling(window, min_periods).min()와 같은 배열"""
+    return _rolling_extreme(values, window, min_periods, np.fmin)
+
+
+def rolling_mean(values, window, min_periods=None):
+    """rolling(window, min_periods).mean() — 누적합 방식 (정수 입력은 정확, 실수는 누적 오차 가능)"""
+    values = np.asarray(values)
+    n = len(values)
+    min_periods = window if min_periods is None else min_periods
+    total, count = _prefix(values)
+    ends = np.arange(1, n + 1)
+    starts = np.maximum(ends - window, 0)
+    c = count[ends] - count[starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (total[ends] - total[starts]) / c
+    out[c < max(min_periods, 1)] = np.nan
+    return out
@@ -17,49 +17,220 @@ KOSPI 시장 국면 감지 모듈 — Option A (약세 Hard Block)
     → bad <  2 : 강세
 """
 import os
+import zipfile
+import hashlib
+import numpy as np
 import pandas as pd
 
-_kospi_df = None
-_kospi_by_date = {}   # date → (idx, row)
+from modules.range_index import rolling_max
+
+# 국면 배열 디스크 캐시 (KOSPI 파일 지문 + 지표/국면 코드 스탬프로 검증)
+REGIME_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                '.cache', 'regime')
+REGIME_VERSION = 1   # 국면 로직 변경 시 증가 (소스 해시와 함께 캐시 키에 포함)
+
+# 현재 국면 데이터 (첫 조회 시 xml/KOSPI.xml 자동 로드 — import 시점에는 아무것도 안 함)
+#   {'first_ordinal': 첫 날짜 서수,
+#    'day_codes': int8 국면 코드 (0 강세 / 1 횡보 / 2 약세 / -1 데이터 없는 날),
+#    'day_bad':   int8 bad score (데이터 없는 날 -1),
+#    'source':    원본 경로}
+#   날짜 d의 값은 배열[d.toordinal() - first_ordinal]
+_regime = None
+_auto_load = True   # 아직 load_kospi/set_regime이 호출되지 않았으면 첫 조회 때 자동 로드
+
+_EPOCH_ORDINAL = 719163    # date(1970, 1, 1).toordinal()
 
 
 # ─────────────────────────────────────────────────────────────
-# KOSPI 데이터 로드 (모듈 초기화 시 1회만 실행)
+# KOSPI 데이터 로드 (첫 조회 시 1회, 국면 배열은 디스크 캐시)
 # ─────────────────────────────────────────────────────────────
-def load_kospi(kospi_path=None):
+def _default_kospi_path():
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, 'xml', 'KOSPI.xml')
+
+
+def _regime_cache_path(kospi_path, cache_dir):
+    from modules.indicators import indicator_code_stamp
+
+    st = os.stat(kospi_path)
+    with open(os.path.abspath(__file__), 'rb') as f:
+        src_hash = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((os.path.abspath(kospi_path), st.st_size, st.st_mtime_ns,
+                   indicator_code_stamp(), REGIME_VERSION, src_hash)).encode())
+    return os.path.join(cache_dir, h.hexdigest() + '.npz')
+
+
+def _load_regime_cache(path, kospi_path):
+    try:
+        with np.load(path) as z:
+            return {'first_ordinal': int(z['first_ordinal']),
+                    'day_codes': z['day_codes'], 'day_bad': z['day_bad'],
+                    'source': os.path.abspath(kospi_path)}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def _save_regime_cache(path, regime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, first_ordinal=regime['first_ordinal'],
+                 day_codes=regime['day_codes'], day_bad=regime['day_bad'])
+    os.replace(tmp, path)
+
+
+def load_kospi(kospi_path=None, cache_dir=None, use_cache=True):
     """
-    KOSPI XML 파일을 로드하고 지표를 계산합니다.
+    KOSPI 국면 배열을 준비합니다. (디스크 캐시 적중 시 XML 파싱·지표 계산 생략)
     kospi_path 생략 시 xml/KOSPI.xml 경로를 자동으로 탐색합니다.
+    직접 호출하지 않아도 첫 국면 조회 때 기본 경로로 한 번 자동 호출됩니다.
 
     Returns:
         True  — 로드 성공
         False — 파일 없음 (필터 비활성화 상태로 동작)
     """
-    global _kospi_df, _kospi_by_date
+    global _auto_load
+    _auto_load = False
 
     if kospi_path is None:
-        base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        kospi_path = os.path.join(base, 'xml', 'KOSPI.xml')
+        kospi_path = _default_kospi_path()
 
     if not os.path.exists(kospi_path):
         return False
 
-    from modules.data_parser import parse_stock_xml
-    from modules.indicators import calc_all_indicators
+    cache_path = _regime_cache_path(kospi_path, cache_dir or REGIME_CACHE_DIR)
+    regime = _load_regime_cache(cache_path, kospi_path) if use_cache else None
+
+    if regime is None:
+        from modules.data_parser import parse_stock_xml_cached
+        from modules.indicators import calc_all_indicators_cached
+
+        df, _, _ = parse_stock_xml_cached(kospi_path)
+        df = calc_all_indicators_cached(df)
+        regime = build_regime(df, source=os.path.abspath(kospi_path))
+        if use_cache and regime is not None:
+            try:
+                _save_regime_cache(cache_path, regime)
+            except OSError:
+                pass
 
-    df, _, _ = parse_stock_xml(kospi_path)
-    df = calc_all_indicators(df)
-    _kospi_df = df
-    _kospi_by_date = {row['date'].date(): (i, row) for i, row in df.iterrows()}
+    set_regime(regime)
     return True
 
 
+def build_regime(df, source=None):
+    """지표 계산된 KOSPI DataFrame → 국면 객체 (set_regime으로 주입 가능, 빈 데이터면 None)"""
+    days, bad, codes = calc_regime_series(df)
+    if len(days) == 0:
+        return None
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    day_codes = np.full(span, -1, dtype=np.int8)
+    day_bad = np.full(span, -1, dtype=np.int8)
+    day_codes[days - first] = codes   # 같은 날짜가 여럿이면 마지막 봉
+    day_bad[days - first] = bad
+    return {'first_ordinal': first, 'day_codes': day_codes, 'day_bad': day_bad,
+            'source': source}
+
+
+def set_regime(regime):
+    """
+    국면 객체 주입 (build_regime / get_regime 결과, 프로세스 풀 워커에 전달할 때 등)
+    None을 주입하면 KOSPI 데이터 없음(항상 강세) 상태 — 이후 자동 로드 안 함
+    """
+    global _regime, _auto_load
+    _regime = regime
+    _auto_load = False
+
+
+def get_regime():
+    """현재 국면 객체 (필요하면 자동 로드, KOSPI 데이터 없으면 None)"""
+    if _auto_load:
+        load_kospi()
+    return _regime
+
+
+def calc_regime_series(df):
+    """
+    KOSPI DataFrame → 봉별 (날짜 서수, bad score, 국면 코드) 배열
+
+    봉마다 아래 detect_regime 기준을 rolling/shift로 한 번에 계산
+    MA20/MA60이 없는 봉은 국면 1(횡보)
+    """
+    n = len(df)
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    ma20 = df['ma_20'].to_numpy(dtype=float) if 'ma_20' in df.columns else np.full(n, np.nan)
+    ma60 = df['ma_60'].to_numpy(dtype=float) if 'ma_60' in df.columns else np.full(n, np.nan)
+
+    def back(values, k):
+        out = np.full(n, np.nan)
+        if n > k:
+            out[k:] = values[:n - k]
+        return out
+
+    bad = np.zeros(n, dtype=np.int8)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # ① MA 배열
+        bad += np.where(ma20 < ma60, 2, np.where((ma20 - ma60) / ma60 < 0.02, 1, 0)).astype(np.int8)
+
+        # ② MA60 기울기 (20일 전 대비)
+        m60_20 = back(ma60, 20)
+        slope = (ma60 - m60_20) / m60_20
+        valid = m60_20 > 0
+        bad += np.where(valid & (slope < -0.02), 2, np.where(valid & (slope < 0), 1, 0)).astype(np.int8)
+
+        # ③ 60일 수익률
+        c60 = back(close, 60)
+        r60 = (close - c60) / c60
+        valid = c60 > 0
+        bad += np.where(valid & (r60 < -0.10), 2, np.where(valid & (r60 < -0.04), 1, 0)).astype(np.int8)
+
+        # ④ 52주 고점 대비 낙폭 (당일 포함 최근 251봉 고가)
+        hi52 = rolling_max(high, 251, min_periods=1)
+        drawdown = (close - hi52) / hi52
+        valid = hi52 > 0
+        bad += np.where(valid & (drawdown < -0.20), 2,
+                        np.where(valid & (drawdown < -0.10), 1, 0)).astype(np.int8)
+
+        # ⑤ 20일 단기 급락
+        c20 = back(close, 20)
+        r20 = (close - c20) / c20
+        bad += ((c20 > 0) & (r20 < -0.05)).astype(np.int8)
+
+    codes = np.where(bad >= 4, 2, np.where(bad >= 2, 1, 0)).astype(np.int8)
+    codes[~(pd.notna(ma20) & pd.notna(ma60))] = 1
+
+    days = df['date'].to_numpy().astype('M8[D]').astype(np.int64) + _EPOCH_ORDINAL
+    return days, bad, codes
+
+
+def regime_series(dates):
+    """
+    날짜 배열(종목 df['date'] 등)에 맞춘 국면 코드 배열 (int8)
+
+    KOSPI 데이터 없음 → 전부 0, KOSPI에 없는 날짜 → 1 (detect_regime과 동일)
+    """
+    dates = np.asarray(dates)
+    regime = get_regime()
+    if regime is None:
+        return np.zeros(len(dates), dtype=np.int8)
+    day_codes = regime['day_codes']
+    days = dates.astype('M8[D]').astype(np.int64) + _EPOCH_ORDINAL - regime['first_ordinal']
+    inside = (days >= 0) & (days < len(day_codes))
+    codes = np.full(len(dates), -1, dtype=np.int8)
+    codes[inside] = day_codes[days[inside]]
+    codes[codes < 0] = 1
+    return codes
+
+
 # ─────────────────────────────────────────────────────────────
 # 국면 감지
 # ─────────────────────────────────────────────────────────────
 def detect_regime(date):
     """
-    주어진 날짜의 KOSPI 시장 국면을 반환합니다.
+    주어진 날짜의 KOSPI 시장 국면을 반환합니다. (load_kospi 때 계산한 배열 조회)
 
     Parameters:
         date : datetime.date 또는 pandas Timestamp
@@ -67,71 +238,27 @@ def detect_regime(date):
     Returns:
         0 = 강세, 1 = 횡보, 2 = 약세
     """
-    if not _kospi_by_date:
+    regime = get_regime()
+    if regime is None:
         return 0  # KOSPI 데이터 없으면 강세로 가정 → 차단 없음
 
-    d = date.date() if hasattr(date, 'date') else date
-    if d not in _kospi_by_date:
+    day_codes = regime['day_codes']
+    pos = date.toordinal() - regime['first_ordinal']
+    if pos < 0 or pos >= len(day_codes) or day_codes[pos] < 0:
         return 1  # 해당 날짜 없음 → 안전하게 횡보 처리
+    return int(day_codes[pos])
 
-    kidx, krow = _kospi_by_date[d]
-    ma20  = krow.get('ma_20')
-    ma60  = krow.get('ma_60')
-    close = krow['close']
-
-    if not (pd.notna(ma20) and pd.notna(ma60)):
-        return 1
-
-    bad = 0
-
-    # ① MA 배열
-    if ma20 < ma60:
-        bad += 2
-    elif (ma20 - ma60) / ma60 < 0.02:
-        bad += 1
-
-    # ② MA60 기울기 (20일 전 대비)
-    if kidx >= 20:
-        m60_20 = _kospi_df.iloc[kidx - 20].get('ma_60')
-        if pd.notna(m60_20) and m60_20 > 0:
-            slope = (ma60 - m60_20) / m60_20
-            if slope < -0.02:
-                bad += 2
-            elif slope < 0:
-                bad += 1
-
-    # ③ 60일 수익률
-    if kidx >= 60:
-        c60 = _kospi_df.iloc[kidx - 60]['close']
-        if c60 > 0:
-            r60 = (close - c60) / c60
-            if r60 < -0.10:
-                bad += 2
-            elif r60 < -0.04:
-                bad += 1
-
-    # ④ 52주 고점 대비 낙폭
-    hi52 = _kospi_df['high'].iloc[max(0, kidx - 250):kidx + 1].max()
-    if hi52 > 0:
-        drawdown = (close - hi52) / hi52
-        if drawdown < -0.20:
-            bad += 2
-        elif drawdown < -0.10:
-            bad += 1
-
-    # ⑤ 20일 단기 급락 (조기 경보)
-    if kidx >= 20:
-        c20 = _kospi_df.iloc[kidx - 20]['close']
-        if c20 > 0:
-            r20 = (close - c20) / c20
-            if r20 < -0.05:
-                bad += 1
-
-    if bad >= 4:   # 기존 5 → 4로 강화
-        return 2  # 약세
-    if bad >= 2:
-        return 1  # 횡보
-    return 0      # 강세
+
+def bad_score(date):
+    """주어진 날짜의 bad score (KOSPI 데이터/해당 날짜 없으면 None)"""
+    regime = get_regime()
+    if regime is None:
+        return None
+    day_bad = regime['day_bad']
+    pos = date.toordinal() - regime['first_ordinal']
+    if pos < 0 or pos >= len(day_bad) or day_bad[pos] < 0:
+        return None
+    return int(day_bad[pos])
 
 
 def is_bear_market(date):
@@ -4,6 +4,16 @@ from modules.benford import (
     analyze_volume_benford,
     analyze_price_change_benford,
     is_near_psychological_level,
+    multi_window_benford,
+    first_digit_cumcounts,
+    price_change_cumcounts,
+    rolling_volume_benford,
+    rolling_price_change_benford,
+    rolling_multi_window_benford,
+)
+from modules.range_index import (
+    range_index_for, range_max, range_min, range_mean,
+    rolling_max, rolling_min, rolling_mean,
 )
 
 
@@ -100,7 +110,7 @@ def calculate_buy_score(df, idx, benford_window=30, profile_name='default',
         return 0.0, {}
 
     # 2. 20일 고점 근접 (프로필별 범위)
-    high_20d = df['high'].iloc[max(0, idx - 20):idx + 1].max()
+    high_20d = range_max(range_index_for(df), 'high', max(0, idx - 20), idx)
     if high_20d <= 0:
         return 0.0, {}
     dist_from_high = (high_20d - row['close']) / high_20d
@@ -321,6 +331,218 @@ def calculate_buy_score(df, idx, benford_window=30, profile_name='default',
     return final_score, details
 
 
+def _col(df, name, default=np.nan):
+    """컬럼을 float 배열로 반환 (컬럼이 없으면 default로 채움)"""
+    if name in df.columns:
+        return df[name].to_numpy(dtype=float)
+    return np.full(len(df), default, dtype=float)
+
+
+def _shift(values, n):
+    """n봉 전 값 배열 (df.iloc[idx - n] 대응, 앞쪽 n개는 NaN)"""
+    out = np.full(len(values), np.nan)
+    if n < len(values):
+        out[n:] = values[:len(values) - n]
+    return out
+
+
+def calculate_buy_score_series(df, benford_window=30, profile_name='default',
+                               benford_influence=0.15, benford_min_hits=5):
+    """
+    calculate_buy_score의 전체 시계열 버전 — 종목당 1회 호출로 모든 봉 스코어 계산
+
+    필수 조건·가점·벤포드 승수를 idx별 함수와 똑같이 배열 연산으로 적용
+    (가점은 원본과 같은 순서로 누적하므로 부동소수점 결과까지 동일)
+
+    Returns:
+        scores     : np.ndarray (len(df),) — 필수 조건 미통과 봉은 0.0
+        components : dict
+            'gate'     : 필수 조건 통과 여부 (bool)
+            'core'     : 필수 조건 통과 기본점 (5.0)
+            'rsi', 'macd', 'ret20d', 'volume', 'candle', 'streak',
+            'breakout', 'long_trend', 'ma200', 'ichimoku' : 항목별 가점
+            'ichimoku_cloud', 'ichimoku_cross', 'ichimoku_twist' : 일목 가점 세부
+            'benford'  : 벤포드 승수 (미통과 봉은 1.0)
+    """
+    p = get_profile(profile_name)
+    n = len(df)
+    idx = np.arange(n)
+
+    close = _col(df, 'close')
+    open_ = _col(df, 'open')
+    high = _col(df, 'high')
+    ma5 = _col(df, 'ma_5')
+    ma20 = _col(df, 'ma_20')
+    ma60 = _col(df, 'ma_60')
+    vol_ratio = _col(df, 'vol_ratio')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # ============================================================
+        # 필수 조건 5가지 (NaN 비교는 원본과 같이 '실패 조건 불충족'으로 처리)
+        # ============================================================
+        gate = idx >= 60
+
+        # 1. 정배열
+        gate &= ~np.isnan(ma5) & ~np.isnan(ma20) & ~np.isnan(ma60)
+        gate &= (ma5 > ma20) & (ma20 > ma60)
+
+        # 2. 20일 고점 근접
+        high_20d = rolling_max(high, 21, min_periods=1)
+        dist_from_high = (high_20d - close) / high_20d
+        gate &= ~(high_20d <= 0)
+        gate &= ~(dist_from_high > p['high_dist_max'])
+
+        # 3. MA20 상승
+        ma20_10ago = _shift(ma20, 10)
+        gate &= ~np.isnan(ma20_10ago) & (ma20_10ago > 0)
+        ma20_slope = (ma20 - ma20_10ago) / ma20_10ago
+        gate &= ~(ma20_slope < p['ma20_slope_min'])
+
+        # 4. 양봉
+        gate &= ~(close <= open_)
+
+        # 5. 거래량 과열 차단
+        gate &= ~(vol_ratio > p['vol_overheat'])
+
+        # ============================================================
+        # 항목별 가점
+        # ============================================================
+        # 1. RSI 모멘텀
+        rsi = _col(df, 'rsi')
+        rsi_pts = np.select(
+            [rsi >= 80, rsi >= 70, rsi >= 60, rsi >= 50, rsi >= 40, rsi < 40],
+            [2.5, 2.0, 1.0, 0.5, 0.0, -1.0], 0.0)
+
+        # 2. MACD (상한 캡 1.0)
+        macd = _col(df, 'macd')
+        macd_signal = _col(df, 'macd_signal')
+        macd_hist = _col(df, 'macd_hist')
+        prev_macd = _shift(macd, 1)
+        prev_macd_signal = _shift(macd_signal, 1)
+        prev_macd_hist = _shift(macd_hist, 1)
+        hist_up = macd_hist > 0
+        macd_raw = (np.where(hist_up, 1.0, 0.0)
+                    + np.where(hist_up & (macd_hist > prev_macd_hist), 0.5, 0.0)
+                    + np.where((macd > macd_signal) & (prev_macd <= prev_macd_signal), 1.5, 0.0))
+        macd_pts = np.minimum(macd_raw, 1.0)
+
+        # 3. 20일 수익률
+        price_20ago = _shift(close, 20)
+        ret_20d = (close - price_20ago) / price_20ago
+        has_20ago = price_20ago > 0
+        ret20d_pts = np.select(
+            [has_20ago & (ret_20d > p['ret20d_strong']),
+             has_20ago & (ret_20d > p['ret20d_mid']),
+             has_20ago & (ret_20d > p['ret20d_weak'])],
+            [0.5, 0.3, 0.2], 0.0)
+
+        # 4. 거래량 품질
+        if profile_name == 'force_following':
+            volume_pts = np.select(
+                [(vol_ratio >= 3.0) & (vol_ratio <= 7.0),
+                 (vol_ratio >= 1.5) & (vol_ratio < 3.0),
+                 (vol_ratio > 7.0) & (vol_ratio <= p['vol_overheat'])],
+                [0.5, 0.3, -0.5], 0.0)
+        else:
+            volume_pts = np.select(
+                [(vol_ratio >= 1.3) & (vol_ratio <= 3.0),
+                 (vol_ratio > 3.0) & (vol_ratio <= 5.0),
+                 (vol_ratio > 5.0) & (vol_ratio <= p['vol_overheat'])],
+                [0.3, 0.0, -1.0], 0.0)
+
+        # 5. 캔들/패턴 + 연속 상승 (최대 7봉까지 확인)
+        engulfing = _col(df, 'is_bullish_engulfing', 0.0)
+        candle_pts = np.where(engulfing != 0, 1.0, 0.0)
+
+        up = np.zeros(n, dtype=bool)
+        up[1:] = close[1:] > close[:-1]
+        last_break = np.maximum.accumulate(np.where(up, 0, idx))
+        consec = np.minimum(idx - last_break, 7)
+        streak_pts = np.select([(consec >= 2) & (consec <= 5), consec > 5], [0.5, -0.5], 0.0)
+
+        # 7. 20일 신고가
+        breakout_pts = np.where(close >= high_20d * 0.99, 0.5, 0.0)
+
+        # 8. MA60 기울기
+        ma60_20ago = _shift(ma60, 20)
+        ma60_slope = (ma60 - ma60_20ago) / ma60_20ago
+        long_trend_pts = np.where((ma60_20ago > 0) & (ma60_slope > 0.02), 1.5, 0.0)
+
+        # 10. MA200
+        ma200 = _col(df, 'ma_200')
+        ma200_pts = np.select([ma200 > 0], [np.where(close > ma200, 1.5, -1.5)], 0.0)
+
+        # 11. 일목균형표 (구름 위치 / 전환>기준 / 상승구름 순서로 누적)
+        tenkan = _col(df, 'ichi_tenkan')
+        kijun = _col(df, 'ichi_kijun')
+        cloud_a = _col(df, 'ichi_cloud_a')
+        cloud_b = _col(df, 'ichi_cloud_b')
+        has_ichi = ~(np.isnan(tenkan) | np.isnan(kijun) | np.isnan(cloud_a) | np.isnan(cloud_b))
+        cloud_top = np.maximum(cloud_a, cloud_b)
+        cloud_bot = np.minimum(cloud_a, cloud_b)
+        cloud_pts = np.select([has_ichi & (close > cloud_top), has_ichi & (close < cloud_bot)],
+                              [2.0, -0.5], 0.0)
+        cross_pts = np.where(has_ichi & (tenkan > kijun), 0.5, 0.0)
+        twist_pts = np.where(has_ichi & (cloud_a > cloud_b), 0.3, 0.0)
+
+    parts = [rsi_pts, macd_pts, ret20d_pts, volume_pts, candle_pts, streak_pts,
+             breakout_pts, long_trend_pts, ma200_pts, cloud_pts, cross_pts, twist_pts]
+    parts = [np.where(gate, x, 0.0) for x in parts]
+    score_base = np.where(gate, 5.0, 0.0)
+    score = score_base
+    for x in parts:
+        score = score + x
+
+    # === 9. 벤포드 승수 (누적 자릿수 히스토그램으로 전 봉 롤링 계산) ===
+    # idx >= 60 이므로 원본 슬라이스 길이는 단기 short_w+1, 장기 61로 고정
+    # → 분석 윈도우가 슬라이스보다 길면 원본처럼 항상 0점
+    bw = min(p.get('benford_weight', 0.10), benford_influence)
+    volume = df['volume'].to_numpy()
+    prices = df['close'].to_numpy()
+    vol_cum = first_digit_cumcounts(volume)
+    pc_cum = price_change_cumcounts(prices)
+    zeros = np.zeros(n)
+    if profile_name == 'force_following':
+        short_w = min(15, benford_window)
+        short_eff = max(short_w, benford_min_hits)
+        long_eff = max(60, benford_min_hits)
+        vol_s = (rolling_volume_benford(volume, short_eff, cum=vol_cum)[0]
+                 if short_eff <= short_w + 1 else zeros)
+        vol_l = (rolling_volume_benford(volume, long_eff, cum=vol_cum)[0]
+                 if long_eff <= 61 else zeros)
+        pc_s = (rolling_price_change_benford(prices, short_eff, cum=pc_cum)[0]
+                if short_eff <= short_w else zeros)
+        combined = (vol_s * 2 + vol_l + pc_s) / 4
+        benford_mult = 1.0 + np.minimum(combined * bw * 2, bw * 2)
+    else:
+        eff_window = max(benford_window, benford_min_hits)
+        vol_bscore, _ = rolling_volume_benford(volume, eff_window, cum=vol_cum)
+        pc_bscore, _ = rolling_price_change_benford(prices, eff_window, cum=pc_cum)
+        benford_mult = 1.0 + np.minimum((vol_bscore + pc_bscore) * 0.1, benford_influence)
+    benford_mult = np.where(gate, benford_mult, 1.0)
+
+    scores = np.where(gate, score * benford_mult, 0.0)
+    components = {
+        'gate': gate,
+        'core': score_base,
+        'rsi': parts[0],
+        'macd': parts[1],
+        'ret20d': parts[2],
+        'volume': parts[3],
+        'candle': parts[4],
+        'streak': parts[5],
+        'breakout': parts[6],
+        'long_trend': parts[7],
+        'ma200': parts[8],
+        'ichimoku': parts[9] + parts[10] + parts[11],
+        'ichimoku_cloud': parts[9],
+        'ichimoku_cross': parts[10],
+        'ichimoku_twist': parts[11],
+        'benford': benford_mult,
+    }
+    return scores, components
+
+
 # ============================================================
 # 매집 감지 스코어링 — 모멘텀과 근본적으로 다른 전략
 # ============================================================
@@ -411,7 +633,6 @@ def calculate_accumulation_score(df, idx, profile_name='default'):
             details['vpd'] = f'약VPD({vpd_val:.1f})'
 
     # 3. 벤포드 멀티윈도우 (0~3점)
-    from modules.benford import multi_window_benford
     volumes = df['volume'].iloc[max(0, idx - 30):idx + 1].values
     _, alert_level = multi_window_benford(volumes)
     if alert_level == 2:
@@ -425,8 +646,7 @@ def calculate_accumulation_score(df, idx, profile_name='default'):
     if idx >= 10:
         vol_avg_col = row.get('vol_avg', None)
         if pd.notna(vol_avg_col) and vol_avg_col > 0:
-            recent_10 = df['volume'].iloc[idx - 9:idx + 1]
-            avg_recent = recent_10.mean()
+            avg_recent = range_mean(range_index_for(df), 'volume', idx - 9, idx)
             vol_ratio_10d = avg_recent / vol_avg_col
             if vol_ratio_10d < 0.6:
                 score += 2.0
@@ -437,9 +657,9 @@ def calculate_accumulation_score(df, idx, profile_name='default'):
 
     # 5. 가격 기반 형성 (0~2점) — 횡보/압축
     if idx >= 20:
-        recent_20 = df.iloc[idx - 19:idx + 1]
-        price_range = (recent_20['high'].max() - recent_20['low'].min())
-        avg_price = recent_20['close'].mean()
+        ri = range_index_for(df)
+        price_range = range_max(ri, 'high', idx - 19, idx) - range_min(ri, 'low', idx - 19, idx)
+        avg_price = range_mean(ri, 'close', idx - 19, idx)
         if avg_price > 0:
             range_pct = price_range / avg_price
             if range_pct < 0.08:
@@ -450,3 +670,175 @@ def calculate_accumulation_score(df, idx, profile_name='default'):
                 details['base'] = f'좁은레인지({range_pct*100:.1f}%)'
 
     return score, details
+
+
+def calculate_accumulation_score_series(df, profile_name='default'):
+    """
+    calculate_accumulation_score의 전체 시계열 버전 — 종목당 1회 호출
+
+    10일 거래량 평균, 20일 고저 레인지/종가 평균, 멀티윈도우 벤포드 alert를
+    모두 롤링 시계열로 한 번에 계산
+
+    Returns:
+        scores     : np.ndarray (len(df),) — 필수 게이트 미통과 봉은 0.0
+        components : dict
+            'gate' : 필수 게이트 통과 여부 (bool)
+            'sde', 'vpd', 'benford', 'vol_compress', 'base' : 항목별 점수
+    """
+    p = ACCUM_PROFILES.get(profile_name, ACCUM_PROFILES['default'])
+    n = len(df)
+    idx = np.arange(n)
+
+    close = _col(df, 'close')
+    rsi = _col(df, 'rsi')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # ── 필수 게이트 ──
+        gate = idx >= 60
+        gate &= ~((rsi < p['rsi_range'][0]) | (rsi > p['rsi_range'][1]))
+
+        close_5ago = _shift(close, 5)
+        ret_5d = np.abs((close - close_5ago) / close_5ago)
+        gate &= ~((close_5ago > 0) & (ret_5d > p['max_price_change_5d']))
+
+        gate &= _col(df, 'sde_signal', 0.0) == 3
+
+        # 2. VPD
+        vpd = _col(df, 'vpd', 0.0)
+        vpd_pts = np.select(
+            [vpd >= p['vpd_strong'], vpd >= p['vpd_threshold'], vpd >= 2.0],
+            [4.0, 2.5, 1.0], 0.0)
+
+        # 4. 거래량 압축 (최근 10일 평균 / vol_avg)
+        vol_avg = _col(df, 'vol_avg')
+        avg_recent = rolling_mean(df['volume'].to_numpy(), 10, min_periods=1)
+        vol_ratio_10d = avg_recent / vol_avg
+        has_avg = vol_avg > 0
+        compress_pts = np.select(
+            [has_avg & (vol_ratio_10d < 0.6), has_avg & (vol_ratio_10d < 0.8)],
+            [2.0, 1.0], 0.0)
+
+        # 5. 가격 기반 형성 (20일 레인지 / 20일 평균가)
+        price_range = (rolling_max(df['high'].to_numpy(), 20, min_periods=1)
+                       - rolling_min(df['low'].to_numpy(), 20, min_periods=1))
+        avg_price = rolling_mean(df['close'].to_numpy(), 20, min_periods=1)
+        range_pct = price_range / avg_price
+        has_price = avg_price > 0
+        base_pts = np.select(
+            [has_price & (range_pct < 0.08), has_price & (range_pct < 0.12)],
+            [2.0, 1.0], 0.0)
+
+    # 3. 벤포드 멀티윈도우 (롤링 alert 시계열)
+    _, alert_level = rolling_multi_window_benford(df['volume'].to_numpy())
+    benford_pts = np.select([alert_level == 2, alert_level == 1], [3.0, 1.5], 0.0)
+
+    parts = [vpd_pts, benford_pts, compress_pts, base_pts]
+    parts = [np.where(gate, x, 0.0) for x in parts]
+    sde_pts = np.where(gate, 5.0, 0.0)
+    scores = sde_pts
+    for x in parts:
+        scores = scores + x
+
+    components = {
+        'gate': gate,
+        'sde': sde_pts,
+        'vpd': parts[0],
+        'benford': parts[1],
+        'vol_compress': parts[2],
+        'base': parts[3],
+    }
+    return scores, components
+
+
+# ============================================================
+# 스코어 구성요소 행렬 — 가중치·임계값 실험을 행렬 곱 한 번으로
+# ============================================================
+# 봉 × 항목 기여도 행렬 M (필수 조건 미통과 봉은 0행) + 게이트 + 벤포드 승수
+#     score = gate × (M @ weights) × benford     (가중치 전부 1.0 = 원본 스코어)
+# 필수 조건(게이트) 자체의 임계값은 바뀌지 않음 → 게이트 조건을 바꾸려면 다시 계산
+# 합산 순서가 원본(항목 순서대로 누적)과 달라 부동소수점 끝자리 차이는 있을 수 있음
+BUY_SCORE_COMPONENTS = ('core', 'rsi', 'macd', 'ret20d', 'volume', 'candle', 'streak',
+                        'breakout', 'long_trend', 'ma200',
+                        'ichimoku_cloud', 'ichimoku_cross', 'ichimoku_twist')
+ACCUM_SCORE_COMPONENTS = ('sde', 'vpd', 'benford', 'vol_compress', 'base')
+
+
+def score_component_matrix(df, mode='momentum', benford_window=30, profile_name='default',
+                           benford_influence=0.15, benford_min_hits=5, dtype=np.float64):
+    """
+    종목 하나 → 스코어 구성요소 행렬
+
+    Returns:
+        dict
+            'columns' : 항목 이름 (행렬 열 순서, BUY_SCORE_COMPONENTS / ACCUM_SCORE_COMPONENTS)
+            'matrix'  : (n, k) 항목별 기여도
+            'gate'    : (n,) 필수 조건 통과 여부
+            'benford' : (n,) 벤포드 승수 (매집 모드는 벤포드가 가점 항목이라 1.0)
+            'scores'  : (n,) 원본 스코어 (calculate_*_score_series 결과)
+    """
+    if mode == 'accumulation':
+        scores, comp = calculate_accumulation_score_series(df, profile_name)
+        columns = ACCUM_SCORE_COMPONENTS
+        benford = np.ones(len(df))
+    else:
+        scores, comp = calculate_buy_score_series(df, benford_window, profile_name,
+                                                  benford_influence, benford_min_hits)
+        columns = BUY_SCORE_COMPONENTS
+        benford = comp['benford']
+    matrix = np.empty((len(df), len(columns)), dtype=dtype)
+    for j, name in enumerate(columns):
+        matrix[:, j] = comp[name]
+    return {'columns': columns, 'matrix': matrix, 'gate': comp['gate'],
+            'benford': benford.astype(dtype), 'scores': scores}
+
+
+def stack_component_matrices(results):
+    """
+    종목별 score_component_matrix 결과 → 유니버스 행렬 하나 (행 이어붙임)
+
+    Returns:
+        같은 키의 dict + 'offsets' — 종목 j의 행은 offsets[j]:offsets[j + 1]
+    """
+    offsets = np.zeros(len(results) + 1, dtype=np.int64)
+    np.cumsum([len(r['gate']) for r in results], out=offsets[1:])
+    columns = results[0]['columns'] if results else BUY_SCORE_COMPONENTS
+    return {
+        'columns': columns,
+        'matrix': (np.concatenate([r['matrix'] for r in results])
+                   if results else np.empty((0, len(columns)))),
+        'gate': np.concatenate([r['gate'] for r in results]) if results else np.empty(0, bool),
+        'benford': np.concatenate([r['benford'] for r in results]) if results else np.empty(0),
+        'scores': np.concatenate([r['scores'] for r in results]) if results else np.empty(0),
+        'offsets': offsets,
+    }
+
+
+def component_weights(columns, weights=None):
+    """{항목: 가중치} → 열 순서 가중치 벡터 (빠진 항목은 1.0)"""
+    weights = weights or {}
+    unknown = set(weights) - set(columns)
+    if unknown:
+        raise ValueError(f'알 수 없는 스코어 항목: {sorted(unknown)}')
+    return np.array([weights.get(name, 1.0) for name in columns])
+
+
+def weighted_scores(cm, weights=None, use_benford=True):
+    """
+    구성요소 행렬 + 가중치 → 봉별 스코어
+
+    weights: None(전부 1.0) / {항목: 가중치} / (k,) 벡터 / (k, m) 행렬 — 가중치 조합 m개를 한 번에
+    use_benford: False면 벤포드 승수 제외
+    Returns:
+        (n,) 또는 (n, m) — 필수 조건 미통과 봉은 0.0
+        임계값 비교는 weighted_scores(...) >= threshold (조합별 임계값은 (m,) 배열로 브로드캐스트)
+    """
+    if weights is None or isinstance(weights, dict):
+        weights = component_weights(cm['columns'], weights)
+    weights = np.asarray(weights, dtype=cm['matrix'].dtype)
+    scores = cm['matrix'] @ weights
+    mult = cm['benford'] if use_benford else np.ones(len(scores), dtype=scores.dtype)
+    gate = cm['gate']
+    if scores.ndim == 2:
+        mult = mult[:, None]
+        gate = gate[:, None]
+    return np.where(gate, scores * mult, 0.0)
@@ -0,0 +1,247 @@
+"""
+멀티코어 파라미터 스윕 — 종목 데이터를 공유 메모리에 한 번만 올려 워커가 무복사로 사용
+
+구조:
+    1. share_universe: 전 종목 컬럼(OHLCV + 지표)을 SharedMemory 블록 하나에 기록
+    2. 워커 초기화 시 블록에 붙어(attach) numpy 뷰로 DataFrame 재구성 (종목 데이터 pickle 없음)
+       KOSPI 국면 배열도 부모에서 한 번 준비해 주입
+    3. 작업 단위 = (기간 + 파라미터 조합, 종목) — 종목 우선 순서로 묶어서 분배해
+       같은 종목·기간의 조합들이 한 워커에서 신호 배열·청산 인덱스를 재사용
+    4. 조합별로 종목 거래를 모아 summarize_trades 형식으로 집계
+
+워커가 호출 스크립트를 다시 import할 수 있으므로(spawn 방식)
+스크립트 본문은 if __name__ == '__main__': 아래에 둘 것
+"""
+import os
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from modules.backtester import run_backtest_fast, compute_signal_arrays, summarize_trades
+from modules.exit_index import build_exit_index
+from modules.universe import period_bounds
+from modules.regime_filter import get_regime, set_regime
+from modules.trade_log import trades_to_array, concat_trade_arrays
+
+
+# compute_signal_arrays 인자 순서 (스코어·진입 후보가 같은 조합끼리 신호 재사용)
+SIGNAL_KEYS = ('buy_threshold', 'benford_window', 'profile_name',
+               'benford_influence', 'benford_min_hits', 'rsi_min', 'mode')
+_BACKTEST_DEFAULTS = {k: p.default for k, p in
+                      inspect.signature(run_backtest_fast).parameters.items()
+                      if p.default is not inspect.Parameter.empty}
+
+# 워커 프로세스 상태 (초기화 시 설정)
+_worker = None
+
+
+# ─────────────────────────────────────────────────────────────
+# 공유 메모리 배치
+# ─────────────────────────────────────────────────────────────
+def share_universe(stocks):
+    """
+    종목 리스트 → 공유 메모리 블록 1개
+
+    stocks: [{'symbol', 'name', 'df'}, ...] (load_universe 결과)
+    Returns:
+        (SharedMemory, layout) — layout은 워커에 넘길 컬럼 위치 정보 (pickle 가능)
+        사용 후 호출 측에서 shm.close(); shm.unlink()
+    """
+    entries = []
+    offset = 0
+    for s in stocks:
+        columns = []
+        for col in s['df'].columns:
+            arr = s['df'][col].to_numpy()
+            offset = (offset + 7) // 8 * 8   # 8바이트 정렬
+            columns.append((col, arr.dtype.str, offset))
+            offset += arr.nbytes
+        entries.append({'symbol': s['symbol'], 'name': s['name'],
+                        'rows': len(s['df']), 'columns': columns})
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for s, entry in zip(stocks, entries):
+        for col, dtype, off in entry['columns']:
+            view = np.ndarray((entry['rows'],), dtype=dtype, buffer=shm.buf, offset=off)
+            view[:] = s['df'][col].to_numpy()
+            del view
+    return shm, {'shm_name': shm.name, 'stocks': entries}
+
+
+def frames_from_shared(buf, layout):
+    """공유 메모리 버퍼 → [{'symbol', 'name', 'df'}] (컬럼은 버퍼의 numpy 뷰)"""
+    stocks = []
+    for entry in layout['stocks']:
+        data = {col: np.ndarray((entry['rows'],), dtype=dtype, buffer=buf, offset=off)
+                for col, dtype, off in entry['columns']}
+        stocks.append({'symbol': entry['symbol'], 'name': entry['name'],
+                       'df': pd.DataFrame(data, copy=False)})
+    return stocks
+
+
+# ─────────────────────────────────────────────────────────────
+# 워커
+# ─────────────────────────────────────────────────────────────
+def _init_worker(layout, jobs, min_rows, keep_details, compact=False, stocks=None,
+                 regime=False):
+    global _worker
+    shm = None
+    if stocks is None:
+        shm = shared_memory.SharedMemory(name=layout['shm_name'])
+        stocks = frames_from_shared(shm.buf, layout)
+    if regime is not False:
+        set_regime(regime)   # 부모가 준비한 국면 배열 주입 (워커별 KOSPI 로드 생략)
+    _worker = {
+        'shm': shm,   # 참조 유지 (해제되면 뷰가 무효화)
+        'stocks': stocks,
+        'jobs': jobs,
+        'min_rows': min_rows,
+        'keep_details': keep_details,
+        'compact': compact,
+        'current': None,   # 직전 종목의 기간별 슬라이스·청산 인덱스·신호 캐시
+    }
+
+
+def _signal_key(params):
+    return tuple(params.get(k, _BACKTEST_DEFAULTS[k]) for k in SIGNAL_KEYS)
+
+
+def _period_slice(stock_idx, job):
+    """현재 종목의 기간 슬라이스 캐시 (같은 종목·기간의 작업끼리 공유)"""
+    w = _worker
+    cur = w['current']
+    if cur is None or cur['stock_idx'] != stock_idx:
+        cur = w['current'] = {'stock_idx': stock_idx, 'periods': {}}
+    key = (job['start'], job['end'], job['warmup'])
+    period = cur['periods'].get(key)
+    if period is None:
+        df = w['stocks'][stock_idx]['df']
+        lo, hi = period_bounds(df['date'].to_numpy(), job['start'], job['end'])
+        period = cur['periods'][key] = {
+            'df': df.iloc[max(0, lo - job['warmup']):hi].reset_index(drop=True),
+            'exit_index': None,
+            'signals': {},
+        }
+    return period
+
+
+def _run_unit(unit):
+    """(작업 번호, 종목 번호) → (작업 번호, 종목 번호, trades 또는 None, 에러)"""
+    job_idx, stock_idx = unit
+    w = _worker
+    job = w['jobs'][job_idx]
+    period = _period_slice(stock_idx, job)
+    df = period['df']
+    if len(df) < w['min_rows']:
+        return job_idx, stock_idx, None, None
+
+    params = job['params']
+    try:
+        if period['exit_index'] is None:
+            period['exit_index'] = build_exit_index(df)
+        key = _signal_key(params)
+        if key not in period['signals']:
+            period['signals'][key] = compute_signal_arrays(df, *key)
+        trades = run_backtest_fast(df, **params, signals=period['signals'][key],
+                                   exit_index=period['exit_index'])
+    except Exception as e:
+        return job_idx, stock_idx, None, f'{type(e).__name__}: {e}'
+
+    if job['warmup'] and job['start'] is not None:
+        # 워밍업 구간에서 진입한 거래 제외 (기간 내 진입만 집계)
+        entry_from = pd.Timestamp(job['start']).normalize()
+        trades = [t for t in trades if t['entry_date'] >= entry_from]
+    if w['compact']:
+        return job_idx, stock_idx, trades_to_array(trades, stock_idx, job_idx), None
+    if not w['keep_details']:
+        for t in trades:
+            t['details'] = None
+    return job_idx, stock_idx, trades, None
+
+
+# ─────────────────────────────────────────────────────────────
+# 스윕 실행
+# ─────────────────────────────────────────────────────────────
+def make_job(params, start=None, end=None, warmup=0):
+    """
+    스윕 작업 1개 = 기간 + 백테스트 파라미터
+
+    start / end: 날짜 기준 양끝 포함 (이 기간을 잘라낸 데이터로 실행)
+    warmup:      start 이전 N봉을 지표 워밍업용으로 함께 잘라내되,
+                 그 구간에서 진입한 거래는 제외
+    """
+    return {'params': dict(params), 'start': start, 'end': end, 'warmup': warmup}
+
+
+def run_jobs(stocks, jobs, min_rows=120, workers=None, keep_details=False, compact=False):
+    """
+    작업(기간 + 파라미터) × 종목 백테스트를 공유 메모리 프로세스 풀로 실행
+
+    jobs:         [make_job(...), ...]
+    min_rows:     기간 슬라이스(워밍업 포함)가 이보다 짧은 종목 제외
+    workers:      프로세스 수 (None = CPU 코어 수, 1 = 현재 프로세스에서 순차 처리)
+    keep_details: False면 trades의 스코어 상세(details) 제거 (전송량 절감)
+    compact:      True면 trades를 trade_log 구조화 배열로 반환
+                  (symbol = 종목 번호, combo = 작업 번호, details 없음)
+
+    Returns:
+        작업 순서 리스트 [{'params', 'start', 'end', 'units', 'summary', 'errors'}, ...]
+            units:   [{'symbol', 'name', 'trades', 'summary'}] — 거래가 있는 종목만
+            summary: 해당 작업 전 종목 거래의 summarize_trades 결과
+            errors:  [(종목코드, 에러 메시지)]
+    """
+    units = [(j, s) for s in range(len(stocks)) for j in range(len(jobs))]
+    workers = min(workers or os.cpu_count() or 1, max(len(stocks), 1))
+
+    if workers <= 1:
+        _init_worker(None, jobs, min_rows, keep_details, compact, stocks=stocks)
+        outputs = [_run_unit(u) for u in units]
+    else:
+        uses_regime = any(job['params'].get('use_regime_filter', True) for job in jobs)
+        regime = get_regime() if uses_regime else False
+        shm, layout = share_universe(stocks)
+        try:
+            # 종목 단위로 묶이도록 chunksize = 작업 수 (너무 크면 종목 수 기준으로 분할)
+            chunksize = max(1, min(len(jobs), len(units) // (workers * 4) or 1))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(layout, jobs, min_rows, keep_details,
+                                               compact, None, regime)) as ex:
+                outputs = list(ex.map(_run_unit, units, chunksize=chunksize))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    results = [{'params': job['params'], 'start': job['start'], 'end': job['end'],
+                'units': [], 'summary': None, 'errors': []} for job in jobs]
+    for job_idx, stock_idx, trades, error in outputs:
+        res = results[job_idx]
+        if error is not None:
+            res['errors'].append((stocks[stock_idx]['symbol'], error))
+        elif trades is not None and len(trades):
+            res['units'].append({'symbol': stocks[stock_idx]['symbol'],
+                                 'name': stocks[stock_idx]['name'],
+                                 'trades': trades,
+                                 'summary': summarize_trades(trades)})
+    for res in results:
+        if compact:
+            merged = concat_trade_arrays([u['trades'] for u in res['units']])
+            res['summary'] = summarize_trades(merged)
+        else:
+            res['summary'] = summarize_trades([t for u in res['units'] for t in u['trades']])
+    return results
+
+
+def run_sweep(stocks, param_list, start=None, end=None, min_rows=120,
+              workers=None, keep_details=False, compact=False):
+    """
+    파라미터 조합 × 종목 백테스트 스윕 (단일 기간)
+
+    param_list:  [run_backtest 파라미터 dict, ...]
+    start / end: 백테스트 기간 (날짜 기준 양끝 포함, 기간을 잘라낸 데이터로 실행)
+    나머지 인자와 반환값은 run_jobs와 동일 (조합 순서)
+    """
+    jobs = [make_job(p, start, end) for p in param_list]
+    return run_jobs(stocks, jobs, min_rows, workers, keep_details, compact)
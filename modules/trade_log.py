@@ -0,0 +1,221 @@
+"""
+압축 거래 로그 — trades(dict 리스트) ↔ NumPy 구조화 배열 + 벡터화 요약 통계
+
+스윕/워크포워드에서 수백만 건이 쌓이면 dict 리스트는 메모리·pickle·필터 비용이 큼:
+    - 결과는 정수 코드(RESULT_*), 날짜는 int64(ns), 스코어 상세(details)는 배열 밖 별도 리스트
+    - symbol / combo 필드에 종목·파라미터 조합 번호를 기록해 그룹별 집계
+
+summarize_trade_array: summarize_trades와 같은 dict (같은 순서로 누적해 값도 동일)
+grouped_summary:       종목별/조합별 통계 DataFrame (정렬 + reduceat, 파이썬 루프 없음)
+"""
+import numpy as np
+import pandas as pd
+
+
+RESULT_OPEN = 0
+RESULT_WIN = 1
+RESULT_LOSS = 2
+RESULT_CODES = {'OPEN': RESULT_OPEN, 'WIN': RESULT_WIN, 'LOSS': RESULT_LOSS}
+RESULT_NAMES = {v: k for k, v in RESULT_CODES.items()}
+
+TRADE_DTYPE = np.dtype([
+    ('symbol',       np.int32),    # 종목 번호 (-1 = 미지정)
+    ('combo',        np.int32),    # 파라미터 조합 번호 (-1 = 미지정)
+    ('entry_date',   np.int64),    # ns
+    ('exit_date',    np.int64),    # ns
+    ('entry_price',  np.int64),
+    ('exit_price',   np.int64),
+    ('target_price', np.int64),
+    ('stop_price',   np.int64),
+    ('score',        np.float64),
+    ('result',       np.int8),     # RESULT_*
+    ('return_pct',   np.float64),
+    ('holding_days', np.int32),
+])
+
+
+def trades_to_array(trades, symbol=-1, combo=-1, with_details=False):
+    """
+    trades(dict 리스트) → 구조화 배열
+
+    Returns:
+        배열 (with_details=True면 (배열, details 리스트) — 행 순서 동일)
+    """
+    arr = np.empty(len(trades), dtype=TRADE_DTYPE)
+    arr['symbol'] = symbol
+    arr['combo'] = combo
+    if trades:
+        arr['entry_date'] = [pd.Timestamp(t['entry_date']).value for t in trades]
+        arr['exit_date'] = [pd.Timestamp(t['exit_date']).value for t in trades]
+        for field in ('entry_price', 'exit_price', 'target_price', 'stop_price',
+                      'score', 'return_pct', 'holding_days'):
+            arr[field] = [t[field] for t in trades]
+        arr['result'] = [RESULT_CODES[t['result']] for t in trades]
+    if with_details:
+        return arr, [t.get('details') for t in trades]
+    return arr
+
+
+def array_to_trades(arr, details=None):
+    """구조화 배열 → trades(dict 리스트) (details 리스트를 주면 함께 복원)"""
+    trades = []
+    for i, row in enumerate(arr):
+        trades.append({
+            'entry_date':   pd.Timestamp(int(row['entry_date'])),
+            'entry_price':  int(row['entry_price']),
+            'exit_date':    pd.Timestamp(int(row['exit_date'])),
+            'exit_price':   int(row['exit_price']),
+            'target_price': int(row['target_price']),
+            'stop_price':   int(row['stop_price']),
+            'score':        float(row['score']),
+            'details':      details[i] if details is not None else None,
+            'result':       RESULT_NAMES[int(row['result'])],
+            'return_pct':   float(row['return_pct']),
+            'holding_days': int(row['holding_days']),
+        })
+    return trades
+
+
+def concat_trade_arrays(arrays):
+    """여러 구조화 배열을 하나로 (빈 리스트면 빈 배열)"""
+    arrays = [a for a in arrays if len(a)]
+    if not arrays:
+        return np.empty(0, dtype=TRADE_DTYPE)
+    return np.concatenate(arrays)
+
+
+# ─────────────────────────────────────────────────────────────
+# 요약 통계
+# ─────────────────────────────────────────────────────────────
+def _closed_in_order(arr):
+    """summarize_trades와 같은 순서의 완료 거래 (WIN 전체 → LOSS 전체, 각각 원래 순서)"""
+    return np.concatenate([arr[arr['result'] == RESULT_WIN], arr[arr['result'] == RESULT_LOSS]])
+
+
+def summarize_trade_array(arr):
+    """summarize_trades의 구조화 배열 버전 (best/worst_trade는 dict로 변환해 반환)"""
+    if len(arr) == 0:
+        return {
+            'total': 0, 'wins': 0, 'losses': 0, 'open': 0,
+            'win_rate': 0.0, 'avg_return': 0.0, 'avg_holding': 0,
+        }
+
+    result = arr['result']
+    n_wins = int(np.count_nonzero(result == RESULT_WIN))
+    n_losses = int(np.count_nonzero(result == RESULT_LOSS))
+    n_open = int(np.count_nonzero(result == RESULT_OPEN))
+    closed = _closed_in_order(arr)
+    n_closed = len(closed)
+
+    win_rate = n_wins / n_closed * 100 if n_closed else 0
+    # 누적 순서를 리스트 버전과 맞추기 위해 순차 누적(cumsum/cumprod) 사용
+    avg_return = float(np.cumsum(closed['return_pct'])[-1]) / n_closed if n_closed else 0
+    avg_holding = int(closed['holding_days'].sum()) / n_closed if n_closed else 0
+
+    total_return = 1.0
+    if n_closed:
+        by_entry = closed[np.argsort(closed['entry_date'], kind='stable')]
+        total_return = float(np.cumprod(1 + by_entry['return_pct'] / 100)[-1])
+    total_return_pct = (total_return - 1) * 100
+
+    return {
+        'total': len(arr),
+        'wins': n_wins,
+        'losses': n_losses,
+        'open': n_open,
+        'closed': n_closed,
+        'win_rate': round(win_rate, 2),
+        'avg_return': round(avg_return, 2),
+        'avg_holding': round(avg_holding, 1),
+        'total_return_pct': round(total_return_pct, 2),
+        'best_trade': array_to_trades(closed[[np.argmax(closed['return_pct'])]])[0] if n_closed else None,
+        'worst_trade': array_to_trades(closed[[np.argmin(closed['return_pct'])]])[0] if n_closed else None,
+    }
+
+
+def trade_array_ev(arr, min_trades=8):
+    """backtest_ev의 구조화 배열 버전 → (승률, EV, 유효 거래 수) 또는 (None, None, None)"""
+    closed = _closed_in_order(arr)
+    if len(closed) < min_trades:
+        return None, None, None
+    valid = closed[np.isfinite(closed['return_pct'])]
+    if len(valid) < min_trades:
+        return None, None, None
+    wins = valid['return_pct'][valid['result'] == RESULT_WIN]
+    losses = valid['return_pct'][valid['result'] == RESULT_LOSS]
+    if len(losses) == 0:
+        return None, None, None
+    wr = len(wins) / len(valid)
+    avg_win = np.mean(wins) if len(wins) else 0.0
+    avg_loss = np.mean(losses)
+    ev = wr * avg_win + (1 - wr) * avg_loss
+    if not np.isfinite(ev):
+        return None, None, None
+    return wr, ev, len(valid)
+
+
+def grouped_summary(arr, by='symbol'):
+    """
+    그룹별 요약 통계 (by: 'symbol', 'combo' 또는 두 필드 튜플)
+
+    Returns:
+        DataFrame (그룹당 1행) — total, wins, losses, open, closed, win_rate(%),
+        avg_return, avg_holding, ev(WR×평균이익 + (1-WR)×평균손실, %),
+        total_return_pct(진입일 순 복리), best_return, worst_return
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    columns = keys + ['total', 'wins', 'losses', 'open', 'closed', 'win_rate', 'avg_return',
+                      'avg_holding', 'ev', 'total_return_pct', 'best_return', 'worst_return']
+    if len(arr) == 0:
+        return pd.DataFrame(columns=columns)
+
+    # 그룹 → 진입일 순 정렬 후 그룹 경계에서 reduceat
+    order = np.lexsort([arr['entry_date']] + [arr[k] for k in reversed(keys)])
+    s = arr[order]
+    key_cols = [s[k] for k in keys]
+    change = np.zeros(len(s), dtype=bool)
+    change[0] = True
+    for col in key_cols:
+        change[1:] |= col[1:] != col[:-1]
+    starts = np.flatnonzero(change)
+    group_id = np.cumsum(change) - 1
+    n_groups = len(starts)
+
+    result = s['result']
+    is_win = result == RESULT_WIN
+    is_loss = result == RESULT_LOSS
+    is_closed = is_win | is_loss
+    ret = s['return_pct']
+
+    def count(mask):
+        return np.bincount(group_id, weights=mask, minlength=n_groups).astype(np.int64)
+
+    def total(values, mask):
+        return np.bincount(group_id, weights=np.where(mask, values, 0.0), minlength=n_groups)
+
+    total_n = np.diff(np.append(starts, len(s)))
+    wins, losses, opens = count(is_win), count(is_loss), count(result == RESULT_OPEN)
+    closed = wins + losses
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(closed > 0, wins / closed * 100, 0.0)
+        avg_return = np.where(closed > 0, total(ret, is_closed) / closed, 0.0)
+        avg_holding = np.where(closed > 0, total(s['holding_days'], is_closed) / closed, 0.0)
+        avg_win = np.where(wins > 0, total(ret, is_win) / wins, 0.0)
+        avg_loss = np.where(losses > 0, total(ret, is_loss) / losses, 0.0)
+        wr = np.where(closed > 0, wins / closed, 0.0)
+        ev = np.where(closed > 0, wr * avg_win + (1 - wr) * avg_loss, np.nan)
+
+    factor = np.where(is_closed, 1 + ret / 100, 1.0)
+    total_return_pct = (np.multiply.reduceat(factor, starts) - 1) * 100
+    best = np.maximum.reduceat(np.where(is_closed, ret, -np.inf), starts)
+    worst = np.minimum.reduceat(np.where(is_closed, ret, np.inf), starts)
+
+    out = {k: col[starts] for k, col in zip(keys, key_cols)}
+    out.update({
+        'total': total_n, 'wins': wins, 'losses': losses, 'open': opens, 'closed': closed,
+        'win_rate': win_rate, 'avg_return': avg_return, 'avg_holding': avg_holding,
+        'ev': ev, 'total_return_pct': total_return_pct,
+        'best_return': np.where(closed > 0, best, np.nan),
+        'worst_return': np.where(closed > 0, worst, np.nan),
+    })
+    return pd.DataFrame(out, columns=columns)
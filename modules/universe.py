@@ -0,0 +1,119 @@
+"""
+종목 유니버스 로더 — XML 디렉토리 전체를 파싱 + 지표 계산
+
+연구 스크립트마다 따로 있던 load_all_stocks / load_stock을 하나로 통합:
+    - 파싱(parse_stock_xml_cached)과 calc_all_indicators_cached를 프로세스 풀로 분산
+    - 결과는 파일명 정렬 순서 그대로 스트리밍 (실행마다 동일한 순서)
+    - 실패한 파일은 삼키지 않고 (파일명, 에러 메시지)로 보고
+
+병렬 실행 시 워커가 호출 스크립트를 다시 import할 수 있으므로(spawn 방식)
+스크립트 본문은 if __name__ == '__main__': 아래에 둘 것
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.data_parser import parse_stock_xml_cached
+from modules.indicators import calc_all_indicators_cached
+
+
+def list_xml_files(xml_dir, exclude=('KOSPI.xml',)):
+    """XML 디렉토리의 종목 파일명 목록 (정렬, exclude 제외)"""
+    return sorted(f for f in os.listdir(xml_dir)
+                  if f.endswith('.xml') and f not in exclude)
+
+
+def load_stock(filepath, include_accumulation=False):
+    """
+    단일 종목 로드 (파싱 + 지표 계산)
+
+    Returns:
+        dict {'file', 'symbol', 'name', 'df', 'error'}
+        실패 시 df=None, error='예외타입: 메시지'
+    """
+    result = {'file': os.path.basename(filepath), 'symbol': None, 'name': None,
+              'df': None, 'error': None}
+    try:
+        df, symbol, name = parse_stock_xml_cached(filepath)
+        df = calc_all_indicators_cached(df, include_accumulation=include_accumulation)
+        result.update(symbol=symbol, name=name, df=df)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    return result
+
+
+def iter_universe(xml_dir, include_accumulation=False, workers=None,
+                  exclude=('KOSPI.xml',), files=None):
+    """
+    종목을 파일명 순서대로 하나씩 로드해 load_stock 결과 dict를 반환 (제너레이터)
+
+    workers: 프로세스 수 (None = CPU 코어 수, 1 = 현재 프로세스에서 순차 처리)
+    files:   로드할 파일명 목록 (None이면 xml_dir 전체)
+    """
+    if files is None:
+        files = list_xml_files(xml_dir, exclude)
+    paths = [os.path.join(xml_dir, f) for f in files]
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+
+    if workers <= 1:
+        for path in paths:
+            yield load_stock(path, include_accumulation)
+        return
+
+    chunksize = max(1, len(paths) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        yield from ex.map(load_stock, paths, [include_accumulation] * len(paths),
+                          chunksize=chunksize)
+
+
+def load_universe(xml_dir, include_accumulation=False, workers=None,
+                  exclude=('KOSPI.xml',), min_rows=0, progress_every=0):
+    """
+    전체 종목 로드
+
+    min_rows:       이보다 짧은 종목 제외
+    progress_every: N개마다 진행 상황 출력 (0 = 출력 안 함)
+
+    Returns:
+        stocks:   [{'symbol', 'name', 'df'}, ...] (파일명 순서)
+        failures: [(파일명, 에러 메시지), ...]
+    """
+    files = list_xml_files(xml_dir, exclude)
+    stocks = []
+    failures = []
+    for i, item in enumerate(iter_universe(xml_dir, include_accumulation, workers,
+                                           files=files)):
+        if item['error'] is not None:
+            failures.append((item['file'], item['error']))
+        elif len(item['df']) >= min_rows:
+            stocks.append({'symbol': item['symbol'], 'name': item['name'], 'df': item['df']})
+        if progress_every and (i + 1) % progress_every == 0:
+            print(f"    {i+1}/{len(files)} 완료...")
+    return stocks, failures
+
+
+def period_bounds(dates, start=None, end=None):
+    """
+    정렬된 날짜 배열에서 [start, end] (날짜 기준, 양끝 포함) 구간의 (lo, hi) 인덱스
+
+    start/end: datetime.date 또는 Timestamp (None = 제한 없음)
+    """
+    dates = np.asarray(dates)
+    if start is None:
+        lo = 0
+    else:
+        lo = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start).normalize()), 'left'))
+    if end is None:
+        hi = len(dates)
+    else:
+        next_day = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+        hi = int(np.searchsorted(dates, np.datetime64(next_day), 'left'))
+    return lo, max(lo, hi)
+
+
+def slice_period(df, start=None, end=None):
+    """날짜 범위 [start, end] 행만 잘라낸 DataFrame (인덱스 0부터, 데이터 무복사)"""
+    lo, hi = period_bounds(df['date'].to_numpy(), start, end)
+    return df.iloc[lo:hi].reset_index(drop=True)
@@ -0,0 +1,122 @@
+"""
+Walk-forward 최적화 — 학습 구간에서 파라미터 선택 → 바로 다음 검증 구간에 적용을 반복
+
+oos_validation의 고정 1회 분할(학습 ~2021 / 검증 2022~)을 일반화:
+    rolling:  학습 창 길이 고정, 폴드마다 step만큼 함께 이동
+    anchored: 학습 시작 고정, 학습 끝만 늘어남
+
+실행은 modules.sweep.run_jobs 2회로 끝남 (공유 메모리 프로세스 풀):
+    1. 전 폴드 학습 구간 × 후보 파라미터 → 폴드별 최고 점수 파라미터 선택
+    2. 전 폴드 검증 구간 × 선택된 파라미터 → 폴드별 / 전체 OOS 성적
+기간 슬라이스는 searchsorted 인덱스 범위(무복사)이고, 같은 폴드·종목의 후보끼리는
+스코어·진입 후보 배열과 청산 인덱스를 공유
+"""
+import pandas as pd
+
+from modules.backtester import summarize_trades, backtest_ev, composite_score
+from modules.sweep import make_job, run_jobs
+
+
+def make_folds(first_date, last_date, train_months=36, test_months=6, step_months=None,
+               anchored=False):
+    """
+    학습/검증 구간 목록 생성 (날짜 기준 양끝 포함)
+
+    step_months: 폴드 간 이동 폭 (None = test_months, 검증 구간이 겹치지 않게)
+    Returns:
+        [{'fold', 'train_start', 'train_end', 'test_start', 'test_end'}, ...] (datetime.date)
+    """
+    step_months = step_months or test_months
+    first = pd.Timestamp(first_date).normalize()
+    last = pd.Timestamp(last_date).normalize()
+
+    folds = []
+    while True:
+        # 매 폴드를 시작일 기준으로 계산 (월말 클리핑이 누적되지 않도록)
+        offset = len(folds) * step_months
+        test_start = first + pd.DateOffset(months=train_months + offset)
+        if test_start > last:
+            break
+        train_start = first if anchored else first + pd.DateOffset(months=offset)
+        test_end = min(first + pd.DateOffset(months=train_months + offset + test_months)
+                       - pd.Timedelta(days=1), last)
+        folds.append({
+            'fold': len(folds),
+            'train_start': train_start.date(),
+            'train_end': (test_start - pd.Timedelta(days=1)).date(),
+            'test_start': test_start.date(),
+            'test_end': test_end.date(),
+        })
+    return folds
+
+
+def universe_date_range(stocks):
+    """전 종목 데이터의 (첫 날짜, 마지막 날짜)"""
+    firsts = [s['df']['date'].iloc[0] for s in stocks if len(s['df'])]
+    lasts = [s['df']['date'].iloc[-1] for s in stocks if len(s['df'])]
+    return min(firsts).date(), max(lasts).date()
+
+
+def pooled_score(result):
+    """기본 선택 기준: 전 종목 거래를 합친 composite_score (EV 40% + WR 30% + 안정성 30%)"""
+    trades = [t for u in result['units'] for t in u['trades']]
+    wr, ev, n = backtest_ev(trades)
+    return composite_score(wr, ev, n)
+
+
+def run_walk_forward(stocks, param_list, folds, select=None, min_rows=120,
+                     test_warmup=120, workers=None):
+    """
+    Walk-forward 실행
+
+    param_list:  후보 파라미터 dict 리스트 (run_backtest 인자)
+    folds:       make_folds() 결과
+    select:      run_jobs 결과 1개 → 점수 (높을수록 좋음, 기본 pooled_score)
+                 점수가 같으면 param_list 앞쪽 후보 선택, 전부 -999 이하면 그 폴드는 건너뜀
+    min_rows:    학습 슬라이스가 이보다 짧은 종목 제외
+    test_warmup: 검증 구간 앞 N봉을 지표/스코어 워밍업용으로 포함 (진입은 검증 구간 내만 집계)
+
+    Returns:
+        {
+          'folds': [{'fold', 구간 날짜 4개, 'params', 'train_score',
+                     'train': summarize_trades, 'test': summarize_trades, 'test_units'}, ...],
+          'oos':   전 폴드 검증 거래를 합친 summarize_trades 결과,
+          'oos_trades': 전 폴드 검증 거래 리스트 (진입일 순),
+        }
+    """
+    select = select or pooled_score
+
+    # 1. 학습: 폴드 × 후보
+    train_jobs = [make_job(p, f['train_start'], f['train_end'])
+                  for f in folds for p in param_list]
+    train = run_jobs(stocks, train_jobs, min_rows=min_rows, workers=workers)
+
+    chosen = []
+    for k, f in enumerate(folds):
+        best_score, best = -999, None
+        for res in train[k * len(param_list):(k + 1) * len(param_list)]:
+            sc = select(res)
+            if sc > best_score:
+                best_score, best = sc, res
+        if best is not None:
+            chosen.append((f, best, best_score))
+
+    # 2. 검증: 폴드별 선택 파라미터를 바로 다음 구간에 적용
+    test_jobs = [make_job(best['params'], f['test_start'], f['test_end'], warmup=test_warmup)
+                 for f, best, _ in chosen]
+    test = run_jobs(stocks, test_jobs, min_rows=0, workers=workers)
+
+    fold_results = []
+    oos_trades = []
+    for (f, best, score), res in zip(chosen, test):
+        fold_results.append(dict(f, params=best['params'], train_score=score,
+                                 train=best['summary'], test=res['summary'],
+                                 test_units=res['units']))
+        oos_trades.extend(t for u in res['units'] for t in u['trades'])
+    oos_trades.sort(key=lambda t: t['entry_date'])
+
+    return {
+        'folds': fold_results,
+        'oos': summarize_trades(oos_trades),
+        'oos_trades': oos_trades,
+    }
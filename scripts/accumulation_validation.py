@@ -16,36 +16,30 @@ Phase 5: 종합 Go/No-Go 판정
   5. 양수수익/음수수익 비율 > 1.3
 """
 
-import sys, os, warnings
+import sys, warnings
 warnings.filterwarnings('ignore')
 sys.path.insert(0, '/Users/kakao/Desktop/project/연구')
 
 import numpy as np
 import pandas as pd
-from modules.data_parser import parse_stock_xml
-from modules.indicators import calc_all_indicators
-from modules.benford import multi_window_benford, benford_chi_square
+from modules.universe import load_universe
+from modules.exit_index import build_exit_index, first_exit, EXIT_TARGET, EXIT_STOP
+from modules.benford import benford_chi_square, rolling_multi_window_benford
 
 XML_DIR = '/Users/kakao/Desktop/project/연구/xml/'
+WORKERS = None  # 로드 프로세스 수 (None = CPU 코어 수)
 
 # ── 거래 비용 ──
 ROUND_TRIP_COST = 0.0021  # 0.21%
 
 
 def load_all_stocks():
-    """195개 종목 로드 + 매집 지표 계산"""
-    xml_files = sorted([f for f in os.listdir(XML_DIR) if f.endswith('.xml')])
-    stocks = []
-    for fname in xml_files:
-        filepath = os.path.join(XML_DIR, fname)
-        try:
-            df, sym, name = parse_stock_xml(filepath)
-            df = calc_all_indicators(df, include_accumulation=True)
-            if len(df) >= 100:
-                stocks.append((df, sym, name))
-        except Exception:
-            pass
-    return stocks
+    """195개 종목 로드 + 매집 지표 계산 (프로세스 풀 병렬)"""
+    stocks, failures = load_universe(XML_DIR, include_accumulation=True,
+                                     workers=WORKERS, exclude=(), min_rows=100)
+    for fname, err in failures:
+        print(f"  로드 실패: {fname} ({err})")
+    return [(s['df'], s['symbol'], s['name']) for s in stocks]
 
 
 def calc_forward_returns(df, signal_idx):
@@ -99,10 +93,10 @@ def detect_vpd_signals(df, threshold=3.0):
 def detect_benford_signals(df, chi2_long=20, chi2_short=15):
     """멀티윈도우 벤포드 시그널 감지"""
     signals = []
+    # 전 구간 alert_level을 누적 히스토그램으로 한 번에 계산
+    _, alert_levels = rolling_multi_window_benford(df['volume'].values)
     for i in range(60, len(df) - 30):
-        volumes = df['volume'].iloc[max(0, i - 30):i + 1].values
-        _, alert_level = multi_window_benford(volumes)
-        if alert_level >= 2:
+        if alert_levels[i] >= 2:
             rsi = df.iloc[i].get('rsi', 50)
             if pd.notna(rsi) and 25 <= rsi <= 70:
                 signals.append(i)
@@ -251,9 +245,18 @@ def print_validation_report(name, results):
     return passed >= 3
 
 
-def run_mock_backtest(stocks, results, tp_pct=0.25, sl_pct=0.10, max_hold=30):
-    """매집 시그널 기반 모의 백테스트"""
+def run_mock_backtest(stocks, results, tp_pct=0.25, sl_pct=0.10, max_hold=30,
+                      exit_indexes=None):
+    """매집 시그널 기반 모의 백테스트
+
+    exit_indexes: {종목코드: build_exit_index(df)} — TP/SL 스윕 시 한 번 만들어 재사용
+    """
     trades = []
+    frames = {}
+    for df, sym, name in stocks:
+        frames.setdefault(sym, df)
+    if exit_indexes is None:
+        exit_indexes = {}
 
     for r in results:
         if r['max_gain_30d'] is None:
@@ -264,48 +267,32 @@ def run_mock_backtest(stocks, results, tp_pct=0.25, sl_pct=0.10, max_hold=30):
         sl_price = close * (1 - sl_pct)
 
         # 해당 종목 찾기
-        target_df = None
-        for df, sym, name in stocks:
-            if sym == r['symbol']:
-                target_df = df
-                break
+        target_df = frames.get(r['symbol'])
         if target_df is None:
             continue
+        if r['symbol'] not in exit_indexes:
+            exit_indexes[r['symbol']] = build_exit_index(target_df)
 
+        # 시그널 다음 봉부터 max_hold봉 이내 첫 TP/SL 터치 (동시 터치: 시가 <= SL이면 손절)
         sig_idx = r['signal_idx']
-        exit_price = None
-        exit_result = None
-        hold_days = 0
-
-        for d in range(1, min(max_hold + 1, len(target_df) - sig_idx)):
-            day = target_df.iloc[sig_idx + d]
-            hold_days = d
-
-            hit_tp = day['high'] >= tp_price
-            hit_sl = day['low'] <= sl_price
-
-            if hit_tp and hit_sl:
-                if day['open'] <= sl_price:
-                    exit_price = sl_price
-                    exit_result = 'LOSS'
-                else:
-                    exit_price = tp_price
-                    exit_result = 'WIN'
-                break
-            elif hit_tp:
-                exit_price = tp_price
-                exit_result = 'WIN'
-                break
-            elif hit_sl:
-                exit_price = sl_price
-                exit_result = 'LOSS'
-                break
-
-        if exit_result is None:
+        end = min(sig_idx + max_hold + 1, len(target_df))
+        hit_idx, side = first_exit(exit_indexes[r['symbol']], sig_idx + 1,
+                                   tp_price, sl_price, end, tie='target')
+
+        if side == EXIT_TARGET:
+            exit_price = tp_price
+            exit_result = 'WIN'
+            hold_days = hit_idx - sig_idx
+        elif side == EXIT_STOP:
+            exit_price = sl_price
+            exit_result = 'LOSS'
+            hold_days = hit_idx - sig_idx
+        else:
             # max hold 도달 → 종가 청산
             last_idx = min(sig_idx + max_hold, len(target_df) - 1)
             exit_price = target_df.iloc[last_idx]['close']
             exit_result = 'TIMEOUT'
+            hold_days = max(0, end - 1 - sig_idx)
 
         gross_return = (exit_price - close) / close
         net_return = (gross_return - ROUND_TRIP_COST) * 100
@@ -441,10 +428,11 @@ if __name__ == '__main__':
 
         best_ev = -999
         best_tp_sl = (0.25, 0.10)
+        exit_indexes = {}   # 종목별 청산 탐색 인덱스 (TP/SL 조합 간 재사용)
 
         for tp in [0.15, 0.20, 0.25, 0.30]:
             for sl in [0.07, 0.10, 0.13]:
-                trades = run_mock_backtest(stocks, best_results, tp, sl, 30)
+                trades = run_mock_backtest(stocks, best_results, tp, sl, 30, exit_indexes)
                 if not trades:
                     continue
                 wins = [t for t in trades if t['result'] == 'WIN']
@@ -470,7 +458,8 @@ if __name__ == '__main__':
         # 최적 TP/SL로 최종 백테스트
         print(f"\n  최적 TP/SL: TP={best_tp_sl[0]*100:.0f}%, SL={best_tp_sl[1]*100:.0f}%")
 
-        final_trades = run_mock_backtest(stocks, best_results, best_tp_sl[0], best_tp_sl[1], 30)
+        final_trades = run_mock_backtest(stocks, best_results, best_tp_sl[0], best_tp_sl[1], 30,
+                                         exit_indexes)
         if final_trades:
             wins = [t for t in final_trades if t['result'] == 'WIN']
             losses = [t for t in final_trades if t['result'] == 'LOSS']
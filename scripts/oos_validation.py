@@ -9,14 +9,16 @@ Out-of-Sample (OOS) 검증
   - 파라미터를 찾을 때 검증 구간 데이터 일절 사용 안 함
   - 종목별 개별 최적화 금지 (전 종목 동일 파라미터)
   - 검증 구간은 한 번만 사용 (여러 번 보면 또 과적합)
+
+--walk-forward: 고정 1회 분할 대신 학습/검증 창을 굴리며 반복 (폴드별 + 전체 OOS 성적)
 """
 import os, sys, itertools
 from datetime import date
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from modules.data_parser import parse_stock_xml
-from modules.indicators import calc_all_indicators
-from modules.backtester import run_backtest, summarize_trades
+from modules.universe import list_xml_files, load_universe
+from modules.sweep import run_sweep
+from modules.walk_forward import make_folds, universe_date_range, run_walk_forward
 
 XML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'xml')
 TRAIN_END  = date(2021, 12, 31)   # 학습 구간 끝
@@ -31,65 +33,50 @@ PARAM_GRID = {
     'profile_name':  ['default'],
 }
 
+# ── Walk-forward (python oos_validation.py --walk-forward) ─────
+WF_TRAIN_MONTHS = 36     # 학습 창 길이
+WF_TEST_MONTHS  = 6      # 검증 창 길이 (= 폴드 이동 폭)
+WF_ANCHORED     = False  # True: 학습 시작 고정 (창이 점점 길어짐)
+
 MIN_STOCKS  = 30   # 최소 종목 수 기준 (너무 적으면 신뢰 불가)
 MIN_CLOSED  = 3    # 종목당 최소 완료 거래 수
+WORKERS     = None # 로드·스윕 프로세스 수 (None = CPU 코어 수)
 
 # ────────────────────────────────────────────────────────────────
 
 def load_all_stocks():
-    """전체 XML 파싱 + 지표 계산 (한 번만 실행)"""
-    stocks = []
-    xml_files = sorted([f for f in os.listdir(XML_DIR)
-                        if f.endswith('.xml') and f != 'KOSPI.xml'])
-    print(f"  총 {len(xml_files)}개 XML 로드 중...")
-    for i, fname in enumerate(xml_files):
-        try:
-            df, symbol, name = parse_stock_xml(os.path.join(XML_DIR, fname))
-            df = calc_all_indicators(df)
-            stocks.append({'symbol': symbol, 'name': name, 'df': df})
-        except Exception:
-            pass
-        if (i+1) % 40 == 0:
-            print(f"    {i+1}/{len(xml_files)} 완료...")
+    """전체 XML 파싱 + 지표 계산 (한 번만 실행, 프로세스 풀 병렬)"""
+    print(f"  총 {len(list_xml_files(XML_DIR))}개 XML 로드 중...")
+    stocks, failures = load_universe(XML_DIR, workers=WORKERS, progress_every=40)
     print(f"  → {len(stocks)}개 로드 성공")
+    for fname, err in failures:
+        print(f"    로드 실패: {fname} ({err})")
     return stocks
 
 
-def filter_df(df, start=None, end=None):
-    """날짜 범위로 DataFrame 필터 (date 컬럼 기준)"""
-    mask = [True] * len(df)
-    if start:
-        mask = [m and (row >= start) for m, row in zip(mask, df['date'].dt.date)]
-    if end:
-        mask = [m and (row <= end) for m, row in zip(mask, df['date'].dt.date)]
-    return df[mask].reset_index(drop=True)
-
-
-def run_period(stocks, params, start=None, end=None, label=''):
-    """특정 기간으로 필터한 데이터에 백테스트 실행"""
+def period_results(sweep_result):
+    """run_sweep 조합 결과 → 종목별 성적 리스트 (완료 거래 MIN_CLOSED 미만 종목 제외)"""
     results = []
-    for s in stocks:
-        df_cut = filter_df(s['df'], start=start, end=end)
-        if len(df_cut) < 120:   # 데이터 부족 종목 제외
+    for u in sweep_result['units']:
+        sm = u['summary']
+        if sm['closed'] < MIN_CLOSED:
             continue
-        try:
-            trades = run_backtest(df_cut, **params, benford_window=30)
-            if not trades:
-                continue
-            sm = summarize_trades(trades)
-            if sm['closed'] < MIN_CLOSED:
-                continue
-            results.append({
-                'symbol': s['symbol'], 'name': s['name'],
-                'closed': sm['closed'], 'wins': sm['wins'],
-                'win_rate': sm['win_rate'], 'avg_return': sm['avg_return'],
-                'cum_return': sm['total_return_pct'],
-            })
-        except Exception:
-            pass
+        results.append({
+            'symbol': u['symbol'], 'name': u['name'],
+            'closed': sm['closed'], 'wins': sm['wins'],
+            'win_rate': sm['win_rate'], 'avg_return': sm['avg_return'],
+            'cum_return': sm['total_return_pct'],
+        })
     return results
 
 
+def run_period(stocks, params, start=None, end=None, label=''):
+    """특정 기간으로 자른 데이터에 단일 파라미터 백테스트 실행 (120봉 미만 종목 제외)"""
+    sweep = run_sweep(stocks, [dict(params, benford_window=30)], start=start, end=end,
+                      min_rows=120, workers=WORKERS)
+    return period_results(sweep[0])
+
+
 def score_results(results):
     """파라미터 조합 평가 점수 (전 종목 기준)"""
     if len(results) < MIN_STOCKS:
@@ -143,6 +130,37 @@ def print_result(label, results, params=None):
               f"{r['closed']:>5}건 {r['avg_return']:>+7.2f}%")
 
 
+def run_walk_forward_report(stocks):
+    """학습/검증 창을 굴리며 같은 원칙(전 종목 공통 파라미터)으로 반복 검증"""
+    keys   = list(PARAM_GRID.keys())
+    combos = list(itertools.product(*[PARAM_GRID[k] for k in keys]))
+    param_list = [dict(zip(keys, combo), benford_window=30) for combo in combos]
+
+    first, last = universe_date_range(stocks)
+    folds = make_folds(first, last, WF_TRAIN_MONTHS, WF_TEST_MONTHS, anchored=WF_ANCHORED)
+    print(f"\n[Walk-forward] {'anchored' if WF_ANCHORED else 'rolling'} "
+          f"학습 {WF_TRAIN_MONTHS}개월 / 검증 {WF_TEST_MONTHS}개월 → {len(folds)}개 폴드 × {len(combos)}개 조합")
+
+    wf = run_walk_forward(stocks, param_list, folds,
+                          select=lambda res: score_results(period_results(res)),
+                          min_rows=120, workers=WORKERS)
+
+    print(f"\n  {'폴드':>3}  {'검증 구간':<23}  {'임계':>4} {'TP':>4} {'CD':>3}  "
+          f"{'학습WR':>6}  {'검증WR':>6}  {'검증거래':>6}  {'평균수익':>8}")
+    print(f"  {'-'*78}")
+    for f in wf['folds']:
+        p = f['params']
+        print(f"  {f['fold']:>3}  {f['test_start']} ~ {f['test_end']}  "
+              f"{p['buy_threshold']:>4} {p['take_profit']*100:>3.0f}% {p['cooldown']:>3}  "
+              f"{f['train']['win_rate']:>5.1f}%  {f['test']['win_rate']:>5.1f}%  "
+              f"{f['test'].get('closed', 0):>6}  {f['test']['avg_return']:>+7.2f}%")
+
+    oos = wf['oos']
+    print(f"\n  전체 OOS: {oos['total']}건 (완료 {oos.get('closed', 0)}건)  "
+          f"승률 {oos['win_rate']:.1f}%  건당 평균 {oos['avg_return']:+.2f}%")
+    return wf
+
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("  Out-of-Sample 검증 시작")
@@ -153,26 +171,34 @@ if __name__ == '__main__':
     print("\n[1단계] 데이터 로드")
     stocks = load_all_stocks()
 
+    if '--walk-forward' in sys.argv:
+        run_walk_forward_report(stocks)
+        sys.exit(0)
+
     # 2. 학습 구간 파라미터 탐색
     print(f"\n[2단계] 학습 구간 파라미터 탐색 (~{TRAIN_END})")
     keys   = list(PARAM_GRID.keys())
     combos = list(itertools.product(*[PARAM_GRID[k] for k in keys]))
     print(f"  탐색할 조합 수: {len(combos)}개")
 
+    # 전 조합 × 전 종목을 공유 메모리 기반 프로세스 풀로 한 번에 실행
+    param_list = [dict(zip(keys, combo), benford_window=30) for combo in combos]
+    sweep = run_sweep(stocks, param_list, end=TRAIN_END, min_rows=120, workers=WORKERS)
+
     best_score  = -999
     best_params = None
     best_train  = None
 
-    for i, combo in enumerate(combos):
+    for i, (combo, res) in enumerate(zip(combos, sweep)):
         params = dict(zip(keys, combo))
-        results = run_period(stocks, params, end=TRAIN_END, label='train')
+        results = period_results(res)
         sc = score_results(results)
         if sc > best_score:
             best_score  = sc
             best_params = params.copy()
             best_train  = results
         if (i+1) % 4 == 0:
-            print(f"  조합 {i+1}/{len(combos)} 탐색 중... (현재 최고 점수: {best_score:.1f})")
+            print(f"  조합 {i+1}/{len(combos)} 집계... (현재 최고 점수: {best_score:.1f})")
 
     print(f"\n  ✅ 최적 파라미터 선정 완료 (점수: {best_score:.1f})")
     print_result("학습 구간 성적", best_train, best_params)